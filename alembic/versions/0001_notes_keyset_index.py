@@ -0,0 +1,34 @@
+"""notes keyset index
+
+Revision ID: 0001_notes_keyset_index
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_notes_keyset_index"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # На чистой БД таблиц ещё нет: их создаст init_db() вместе с индексом.
+    if not sa.inspect(op.get_bind()).has_table("notes"):
+        return
+    op.create_index(
+        "ix_notes_owner_updated_id",
+        "notes",
+        ["owner_id", "updated_at", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notes_owner_updated_id", table_name="notes", if_exists=True)
@@ -0,0 +1,40 @@
+"""notes full-text search vector
+
+Revision ID: 0002_notes_fulltext_search
+Revises: 0001_notes_keyset_index
+Create Date: 2026-10-18 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_notes_fulltext_search"
+down_revision: Union[str, None] = "0001_notes_keyset_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not sa.inspect(bind).has_table("notes"):
+        return
+    op.execute(
+        "ALTER TABLE notes ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, "
+        "coalesce(title, '') || ' ' || coalesce(content, ''))) STORED"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_notes_search_vector "
+        "ON notes USING gin (search_vector)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_notes_search_vector")
+    op.execute("ALTER TABLE notes DROP COLUMN IF EXISTS search_vector")
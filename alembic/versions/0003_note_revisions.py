@@ -0,0 +1,61 @@
+"""note revisions
+
+Revision ID: 0003_note_revisions
+Revises: 0002_notes_fulltext_search
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_note_revisions"
+down_revision: Union[str, None] = "0002_notes_fulltext_search"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # На чистой БД таблицы создаст init_db().
+    if not inspector.has_table("notes") or inspector.has_table("note_revisions"):
+        return
+    op.create_table(
+        "note_revisions",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "note_id",
+            sa.Integer(),
+            sa.ForeignKey("notes.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("is_snapshot", sa.Boolean(), nullable=False),
+        sa.Column("base_version", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("content_sha1", sa.String(40), nullable=False),
+        sa.Column("content_length", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+        ),
+        sa.UniqueConstraint(
+            "note_id", "version", name="uq_note_revisions_note_version"
+        ),
+    )
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("note_revisions"):
+        op.drop_table("note_revisions")
@@ -0,0 +1,39 @@
+"""users token version
+
+Revision ID: 0004_users_token_version
+Revises: 0003_note_revisions
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_users_token_version"
+down_revision: Union[str, None] = "0003_note_revisions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # На чистой БД таблицы создаст init_db().
+    if not inspector.has_table("users"):
+        return
+    if "token_version" in {c["name"] for c in inspector.get_columns("users")}:
+        return
+    op.add_column(
+        "users",
+        sa.Column(
+            "token_version", sa.Integer(), server_default="0", nullable=False
+        ),
+    )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "token_version" in {c["name"] for c in inspector.get_columns("users")}:
+        op.drop_column("users", "token_version")
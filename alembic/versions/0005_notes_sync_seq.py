@@ -0,0 +1,89 @@
+"""notes sync seq and tombstones
+
+Revision ID: 0005_notes_sync_seq
+Revises: 0004_users_token_version
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_notes_sync_seq"
+down_revision: Union[str, None] = "0004_users_token_version"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # На чистой БД таблицы создаст init_db().
+    if not inspector.has_table("notes") or not inspector.has_table("users"):
+        return
+
+    if "sync_seq" not in {c["name"] for c in inspector.get_columns("users")}:
+        op.add_column(
+            "users",
+            sa.Column("sync_seq", sa.BigInteger(), server_default="0", nullable=False),
+        )
+    if "seq" not in {c["name"] for c in inspector.get_columns("notes")}:
+        op.add_column(
+            "notes",
+            sa.Column("seq", sa.BigInteger(), server_default="0", nullable=False),
+        )
+        # Существующим заметкам — уникальные номера в ленте владельца,
+        # иначе страница первой синхронизации могла бы разрезать группу seq=0.
+        op.execute(
+            "UPDATE notes SET seq = ranked.rn FROM ("
+            "SELECT id, row_number() OVER "
+            "(PARTITION BY owner_id ORDER BY updated_at, id) AS rn FROM notes"
+            ") AS ranked WHERE notes.id = ranked.id"
+        )
+        op.execute(
+            "UPDATE users SET sync_seq = COALESCE("
+            "(SELECT MAX(seq) FROM notes WHERE notes.owner_id = users.id), 0)"
+        )
+    if "ix_notes_owner_seq" not in {i["name"] for i in inspector.get_indexes("notes")}:
+        op.create_index("ix_notes_owner_seq", "notes", ["owner_id", "seq"])
+
+    if not inspector.has_table("note_tombstones"):
+        op.create_table(
+            "note_tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("note_id", sa.Integer(), nullable=False),
+            sa.Column(
+                "owner_id",
+                sa.Integer(),
+                sa.ForeignKey("users.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("seq", sa.BigInteger(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+            ),
+        )
+        op.create_index(
+            "ix_note_tombstones_owner_seq", "note_tombstones", ["owner_id", "seq"]
+        )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("note_tombstones"):
+        op.drop_table("note_tombstones")
+    if "ix_notes_owner_seq" in {i["name"] for i in inspector.get_indexes("notes")}:
+        op.drop_index("ix_notes_owner_seq", table_name="notes")
+    if "seq" in {c["name"] for c in inspector.get_columns("notes")}:
+        op.drop_column("notes", "seq")
+    if "sync_seq" in {c["name"] for c in inspector.get_columns("users")}:
+        op.drop_column("users", "sync_seq")
@@ -3,6 +3,7 @@ from fastapi import APIRouter
 from .auth import router as auth_router
 from .categories import router as categories_router
 from .notes import router as notes_router
+from .search import router as search_router
 
 router = APIRouter(prefix="/api/v1")
 
@@ -11,6 +12,7 @@ routes = [
     (auth_router, "/auth", ["auth"]),
     (categories_router, "/categories", ["categories"]),
     (notes_router, "/notes", ["notes"]),
+    (search_router, "/search", ["search"]),
 ]
 
 for r, prefix, tags in routes:
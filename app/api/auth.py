@@ -9,13 +9,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
 from app.api.user import get_user_by_email, normalize_email
-from app.core.antibrute import log
+from app.core.antibrute import anti_brute, log
 from app.core.config import settings
 from app.core.limiting import limiter
-from app.core.security import create_access_token, hash_password, verify_password
+from app.core.revocation import denylist
+from app.core.security import (
+    decode_access_token,
+    hash_password_async,
+    verify_password_async,
+)
+from app.core.tokens import (
+    issue_token_pair,
+    refresh_token_ttl_sec,
+    seconds_left,
+    token_versions,
+)
+from app.core.user_cache import UserPrincipal
 from app.db.models import User
 from app.db.session import AsyncSessionLocal, get_session, logger
-from app.schemas.auth import RegisterIn, TokenOut
+from app.schemas.auth import RefreshIn, RegisterIn, TokenOut
 from app.schemas.user import UserOut
 
 router = APIRouter()
@@ -36,7 +48,9 @@ async def register(
         )
 
     user = User(
-        email=email, hashed_password=hash_password(data.password), is_admin=False
+        email=email,
+        hashed_password=await hash_password_async(data.password),
+        is_admin=False,
     )
 
     try:
@@ -70,23 +84,90 @@ async def login(
     email = normalize_email(form.username)
     logger.info("login attempt email=%s", email)
 
+    brute_key = anti_brute.key(request.client.host if request.client else None, email)
+    if await anti_brute.is_blocked(brute_key):
+        logger.warning("login blocked by antibrute email=%s", email)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(anti_brute.BLOCK_SEC)},
+        )
+
     user = await get_user_by_email(session, email)
     if not user:
         logger.warning("login failed: user not found email=%s", email)
+        await anti_brute.fail(brute_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
         )
 
-    if not verify_password(form.password, user.hashed_password):
+    if not await verify_password_async(form.password, user.hashed_password):
         logger.warning("login failed: bad password user_id=%s", user.id)
+        await anti_brute.fail(brute_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
         )
 
-    token = create_access_token(sub=user.id)
+    await anti_brute.ok(brute_key)
     logger.info("login success user_id=%s", user.id)
+    return issue_token_pair(user)
+
+
+def _refresh_claims(token: str) -> dict:
+    try:
+        claims = decode_access_token(token)
+        if claims.get("typ") != "refresh" or not claims.get("jti"):
+            raise ValueError("not a refresh token")
+        return claims
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
+        )
 
-    return {"access_token": token, "token_type": "bearer"}
+
+@router.post("/refresh", response_model=TokenOut)
+@limiter.limit("30/minute")
+async def refresh(
+    request: Request, data: RefreshIn, session: AsyncSession = Depends(get_session)
+):
+    claims = _refresh_claims(data.refresh_token)
+    family = claims["fam"]
+    # /refresh редкий — идём в Redis мимо фильтра, он мог пропустить отзыв.
+    if await denylist.is_denied(family, skip_bloom=True):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked"
+        )
+
+    # Refresh-токен одноразовый. Повторное предъявление значит, что его
+    # украли (или клиент гоняется сам с собой) — отзываем всю цепочку.
+    if not await denylist.claim(claims["jti"], seconds_left(claims)):
+        logger.warning(
+            "refresh token reuse user_id=%s family=%s", claims["sub"], family
+        )
+        await denylist.deny(family, refresh_token_ttl_sec())
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked"
+        )
+
+    user_id = int(claims["sub"])
+    if await token_versions.get(session, user_id) != claims.get("ver"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked"
+        )
+    user = await session.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
+        )
+    return issue_token_pair(user, family=family)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(data: RefreshIn):
+    """Отзывает цепочку: и refresh-, и выданные по ней access-токены."""
+    claims = _refresh_claims(data.refresh_token)
+    await denylist.deny(claims["fam"], refresh_token_ttl_sec())
+    logger.info("logout user_id=%s", claims["sub"])
 
 
 class AdminAuth(AuthenticationBackend):
@@ -101,6 +182,12 @@ class AdminAuth(AuthenticationBackend):
 
         logger.info(f"Попытка входа: email={email}")
 
+        ip = request.client.host if request.client else None
+        brute_key = anti_brute.key(ip, normalize_email(email))
+        if await anti_brute.is_blocked(brute_key):
+            logger.warning(f"Вход отклонён: {email} заблокирован antibrute")
+            return False
+
         try:
             async with AsyncSessionLocal() as session:
                 user = (
@@ -109,16 +196,20 @@ class AdminAuth(AuthenticationBackend):
 
             if not user:
                 logger.warning(f"Вход отклонён: пользователь {email} не найден")
+                await anti_brute.fail(brute_key)
                 return False
 
             if not user.is_admin:
                 logger.warning(f"Вход отклонён: {email} не админ")
+                await anti_brute.fail(brute_key)
                 return False
 
-            if not verify_password(password, user.hashed_password):
+            if not await verify_password_async(password, user.hashed_password):
                 logger.warning(f"Вход отклонён: неверный пароль для {email}")
+                await anti_brute.fail(brute_key)
                 return False
 
+            await anti_brute.ok(brute_key)
             request.session[settings.ADMIN_SESSION_KEY] = user.id
             logger.info(f"Успешный вход: {email}")
             return True
@@ -145,5 +236,5 @@ class AdminAuth(AuthenticationBackend):
 
 
 @router.get("/me", response_model=UserOut)
-async def me(user: User = Depends(get_current_user)):
+async def me(user: UserPrincipal = Depends(get_current_user)):
     return user
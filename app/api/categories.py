@@ -1,6 +1,6 @@
 from sqlite3 import IntegrityError
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,7 +8,10 @@ from starlette import status
 
 from app.api.deps import require_admin
 from app.api.utils.category_utils import get_category_or_404
+from app.api.utils.http_cache import etag_matches, quote_etag
+from app.core.category_cache import category_cache
 from app.db.models import Category
+from app.db.replicas import get_read_session
 from app.db.session import get_session, logger
 from app.schemas.category import CategoryCreate, CategoryOut, CategoryUpdate
 
@@ -16,9 +19,19 @@ router = APIRouter(prefix="/categories", tags=["categories"])
 
 
 @router.get("/", response_model=list[CategoryOut])
-async def list_categories(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(Category).order_by(Category.name))
-    return res.scalars().all()
+async def list_categories(
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
+):
+    items = await category_cache.list(session)
+    etag = quote_etag(category_cache.etag)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    response.headers["ETag"] = etag
+    return items
 
 
 @router.post("/", response_model=CategoryOut, status_code=status.HTTP_201_CREATED)
@@ -56,9 +69,7 @@ async def create_category(
     return category
 
 
-router.put("/{category_id}", response_model=CategoryOut)
-
-
+@router.put("/{category_id}", response_model=CategoryOut)
 async def update_category(
     data: CategoryUpdate,
     admin=Depends(require_admin),
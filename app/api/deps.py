@@ -3,40 +3,67 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import decode_access_token
+from app.core.revocation import denylist
+from app.core.tokens import token_verifier, token_versions
+from app.core.user_cache import UserPrincipal, user_cache
 from app.db.models import User
-from app.db.session import get_session, logger
+from app.db.replicas import get_read_session, retry_on_primary
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session),
-) -> User:
+    session: AsyncSession = Depends(get_read_session),
+) -> UserPrincipal:
     try:
-        logger.debug(
-            "auth_token_prefix", extra={"prefix": token[:12] if token else None}
-        )
-        payload = decode_access_token(token)
+        payload = token_verifier.verify(token)
         sub = payload.get("sub")
-        if not sub:
-            raise ValueError("no sub")
+        if not sub or payload.get("typ") == "refresh":
+            raise ValueError("not an access token")
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
         )
+    # Обычно отвечает bloom-фильтр в памяти, Redis — только при попадании.
+    if await denylist.is_denied(payload.get("fam")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked"
+        )
 
-    result = await session.execute(select(User).where(User.id == int(sub)))
-    user = result.scalar_one_or_none()
+    user_id = int(sub)
+    if "ver" in payload:
+        # Быстрый путь: всё нужное в токене, БД — только при промахе кэшей.
+        version = await token_versions.get(session, user_id)
+        if version is None or version != payload["ver"]:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked"
+            )
+        return UserPrincipal(
+            id=user_id, email=payload["email"], is_admin=bool(payload["adm"])
+        )
+
+    # Токены старого формата (только sub).
+    principal = await user_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    stmt = select(User).where(User.id == user_id)
+    user = (await session.execute(stmt)).scalar_one_or_none()
+    if not user and retry_on_primary(session):
+        user = (await session.execute(stmt)).scalar_one_or_none()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
         )
-    return user
+    principal = UserPrincipal.from_user(user)
+    await user_cache.set(principal)
+    return principal
 
 
-def require_admin(user: User = Depends(get_current_user)) -> User:
+def require_admin(
+    user: UserPrincipal = Depends(get_current_user),
+) -> UserPrincipal:
     if not user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admins only")
     return user
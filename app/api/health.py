@@ -1,4 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from starlette import status
+
+from app.core.readiness import readiness
 
 router = APIRouter(tags=["health"])
 
@@ -6,3 +10,10 @@ router = APIRouter(tags=["health"])
 @router.get("/ping", summary="Liveness probe")
 async def ping():
     return {"status": "ok"}
+
+
+@router.get("/ready", summary="Readiness probe")
+async def ready():
+    state = readiness.state
+    code = status.HTTP_200_OK if state["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(state, status_code=code)
@@ -0,0 +1,55 @@
+import os
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+
+from app.chat.manager import manager
+from app.core.metrics import (
+    CHAT_CONNECTIONS,
+    CHAT_DROPPED,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    PASSWORD_POOL,
+    USER_CACHE_EVENTS,
+)
+from app.core.security import password_pool
+from app.core.user_cache import user_cache
+from app.db.session import pool_stats
+
+router = APIRouter(tags=["health"])
+
+
+def _collect_runtime() -> None:
+    """Значения, которые проще снять в момент scrape, чем вести счётчиками."""
+    pool = pool_stats()
+    if "size" in pool:
+        DB_POOL_SIZE.set(pool["size"])
+        DB_POOL_CHECKED_OUT.set(pool["checked_out"])
+        DB_POOL_OVERFLOW.set(pool["overflow"])
+
+    chat = manager.connection_stats()
+    CHAT_CONNECTIONS.set(chat["active"])
+    CHAT_DROPPED.set(chat["dropped_total"])
+
+    for event, value in user_cache.stats().items():
+        USER_CACHE_EVENTS.labels(event).set(value)
+    for field, value in password_pool.stats().items():
+        PASSWORD_POOL.labels(field).set(value)
+
+
+@router.get("/metrics", summary="Prometheus metrics", include_in_schema=False)
+async def metrics():
+    _collect_runtime()
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Несколько uvicorn-воркеров: агрегируем их файлы метрик.
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
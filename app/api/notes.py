@@ -1,21 +1,415 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 from starlette import status
 
 from app.api.deps import get_current_user
-from app.api.utils.category_utils import get_category_or_400, get_note_or_404
-from app.db.models import Category, Note, User
-from app.db.session import get_session, logger
-from app.schemas.note import NoteCreate, NoteOut, NoteUpdate
+from app.api.utils.category_utils import (
+    get_category_or_400,
+    get_notes_by_ids,
+    lock_note_or_404,
+    read_note_or_404,
+)
+from app.api.utils.db_utils import commit_or_409
+from app.api.utils.http_cache import (
+    check_if_match,
+    is_not_modified,
+    not_modified_response,
+    note_etag,
+    set_validators,
+)
+from app.api.utils.ndjson import iter_ndjson_lines
+from app.api.utils.pagination import decode_sync_token, paginate_notes, split_page
+from app.api.utils.revision_utils import load_version
+from app.api.utils.sync_utils import iter_changes, reserve_seq, sync_token_expired
+from app.core.category_cache import category_cache
+from app.core.constants import (
+    NOTE_CONTENT_MAX_LENGTH,
+    NOTE_EVENTS_HEARTBEAT_SEC,
+    NOTE_REVISIONS_PAGE_SIZE,
+    NOTE_TITLE_MAX_LENGTH,
+    NOTES_BULK_BATCH_SIZE,
+    NOTES_BULK_MAX_LINES,
+    NOTES_EXPORT_YIELD_PER,
+    NOTES_PAGE_SIZE_DEFAULT,
+    NOTES_PAGE_SIZE_MAX,
+    NOTES_SYNC_PAGE_SIZE,
+    NOTES_SYNC_PAGE_SIZE_MAX,
+)
+from app.core.note_events import NoteSubscriber, encode_sse, note_events
+from app.core.user_cache import UserPrincipal
+from app.db.models import Note, NoteRevision
+from app.db.replicas import ReadSessionLocal, get_read_session, retry_on_primary
+from app.db.session import AsyncSessionLocal, get_session, logger
+from app.schemas.note import (
+    BulkImportResult,
+    NoteBatchDeleteOut,
+    NoteBatchGetOut,
+    NoteBatchIds,
+    NoteBatchUpdateIn,
+    NoteBatchUpdateOut,
+    NoteCreate,
+    NoteOut,
+    NotePage,
+    NoteRevisionPage,
+    NoteUpdate,
+    NoteVersionOut,
+)
 
 router = APIRouter(prefix="/notes", tags=["notes"])
 
 
+@router.get("/", response_model=NotePage)
+async def list_notes(
+    cursor: Optional[str] = None,
+    limit: int = Query(NOTES_PAGE_SIZE_DEFAULT, ge=1, le=NOTES_PAGE_SIZE_MAX),
+    category_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+    user: UserPrincipal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    stmt = select(Note).where(Note.owner_id == user.id)
+    if category_id is not None:
+        stmt = stmt.where(Note.category_id == category_id)
+    if created_after is not None:
+        stmt = stmt.where(Note.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(Note.created_at < created_before)
+    if updated_after is not None:
+        stmt = stmt.where(Note.updated_at >= updated_after)
+    if updated_before is not None:
+        stmt = stmt.where(Note.updated_at < updated_before)
+
+    res = await session.execute(paginate_notes(stmt, cursor, limit))
+    items, next_cursor = split_page(list(res.scalars().all()), limit)
+
+    logger.info(
+        "list_notes_ok",
+        extra={"user_id": user.id, "count": len(items), "has_more": bool(next_cursor)},
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/export")
+async def export_notes(user: UserPrincipal = Depends(get_current_user)):
+    # Сессия из get_session закрывается до отправки тела ответа,
+    # поэтому генератор открывает свою и читает серверным курсором.
+    async def lines():
+        async with AsyncSessionLocal() as session:
+            stmt = (
+                select(Note)
+                .where(Note.owner_id == user.id)
+                .order_by(Note.id)
+                .execution_options(yield_per=NOTES_EXPORT_YIELD_PER)
+            )
+            result = await session.stream_scalars(stmt)
+            async for partition in result.partitions():
+                yield "".join(
+                    NoteOut.model_validate(note).model_dump_json() + "\n"
+                    for note in partition
+                )
+
+    logger.info("export_notes_start", extra={"user_id": user.id})
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/sync")
+async def sync_notes(
+    token: Optional[str] = None,
+    limit: int = Query(NOTES_SYNC_PAGE_SIZE, ge=1, le=NOTES_SYNC_PAGE_SIZE_MAX),
+    user: UserPrincipal = Depends(get_current_user),
+):
+    """
+    Изменения с прошлой синхронизации (NDJSON, см. sync_utils.iter_changes).
+    Без token — все заметки; 410 — токен старше хранения удалений,
+    клиенту нужна полная синхронизация.
+    """
+    since, issued_at = -1, time.time()
+    if token:
+        since, issued_at = decode_sync_token(token)
+        if sync_token_expired(issued_at):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync token expired, full resync required",
+            )
+
+    async def lines():
+        # Реплика отдаёт согласованный префикс коммитов — по seq это безопасно.
+        async with ReadSessionLocal() as session:
+            changes = iter_changes(session, user.id, since, limit, issued_at)
+            async for chunk in changes:
+                yield chunk
+
+    logger.info("sync_notes_start", extra={"user_id": user.id, "since": since})
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _subscribe(user_id: int, since: Optional[int]) -> NoteSubscriber:
+    sub = note_events.subscribe(user_id)
+    if since is not None:
+        try:
+            # Только primary: с реплики недавние изменения потерялись бы.
+            async with AsyncSessionLocal() as session:
+                await note_events.replay(session, sub, since)
+        except Exception:
+            note_events.unsubscribe(sub)
+            raise
+    return sub
+
+
+@router.get("/events")
+async def note_events_stream(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, ge=0),
+    user: UserPrincipal = Depends(get_current_user),
+):
+    """SSE-лента изменений заметок; Last-Event-ID (заголовок или query) — докачка."""
+    header = request.headers.get("last-event-id", "")
+    since = int(header) if header.isdigit() else last_event_id
+    sub = await _subscribe(user.id, since)
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    evt = await asyncio.wait_for(
+                        sub.queue.get(), NOTE_EVENTS_HEARTBEAT_SEC
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield encode_sse(evt)
+        finally:
+            note_events.unsubscribe(sub)
+
+    logger.info("note_events_sse_open", extra={"user_id": user.id, "since": since})
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _ws_sender(websocket: WebSocket, sub: NoteSubscriber) -> None:
+    while True:
+        evt = await sub.queue.get()
+        await websocket.send_text(json.dumps(evt, ensure_ascii=False))
+
+
+@router.websocket("/events/ws")
+async def note_events_ws(websocket: WebSocket):
+    """Та же лента по websocket: первым сообщением {"token", "last_event_id"}."""
+    await websocket.accept()
+    try:
+        data = await websocket.receive_json()
+        async with ReadSessionLocal() as session:
+            user = await get_current_user(str(data.get("token") or ""), session)
+    except WebSocketDisconnect:
+        return
+    except Exception:
+        await websocket.close(code=1008, reason="Unauthorized")
+        return
+
+    since = data.get("last_event_id")
+    sub = await _subscribe(user.id, since if isinstance(since, int) else None)
+    sender = asyncio.create_task(_ws_sender(websocket, sub))
+    try:
+        # Клиенту слать нечего — просто ждём закрытия сокета.
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        note_events.unsubscribe(sub)
+
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_notes(
+    request: Request,
+    user: UserPrincipal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    # Категории — один раз до чтения тела; строки проверяются и пишутся
+    # пачками по мере поступления, в памяти не больше одной пачки.
+    existing = {c.id for c in await category_cache.list(session)}
+    batch: list[dict] = []
+    errors: list[dict] = []
+    inserted = 0
+
+    async def flush() -> None:
+        nonlocal inserted
+        if not batch:
+            return
+        # insert() идёт в обход ORM-событий — номера в ленте выдаём сами.
+        # Строка владельца блокируется до коммита всего импорта (см. sync_utils).
+        first_seq = await reserve_seq(session, user.id, len(batch))
+        for offset, row in enumerate(batch):
+            row["seq"] = first_seq + offset
+        await session.execute(insert(Note), batch)
+        inserted += len(batch)
+        batch.clear()
+
+    try:
+        async for line_no, line in iter_ndjson_lines(request):
+            if not line.strip():
+                continue
+            if line_no > NOTES_BULK_MAX_LINES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"At most {NOTES_BULK_MAX_LINES} lines per request",
+                )
+            try:
+                data = NoteCreate.model_validate_json(line)
+            except ValidationError as e:
+                msg = "; ".join(err["msg"] for err in e.errors())
+                errors.append({"line": line_no, "error": msg})
+                continue
+            if len(data.title) > NOTE_TITLE_MAX_LENGTH:
+                errors.append({"line": line_no, "error": "Title is too long"})
+            elif len(data.content) > NOTE_CONTENT_MAX_LENGTH:
+                errors.append({"line": line_no, "error": "Content is too long"})
+            elif data.category_id not in existing:
+                errors.append({"line": line_no, "error": "Category does not exist"})
+            else:
+                batch.append({**data.model_dump(), "owner_id": user.id})
+                if len(batch) >= NOTES_BULK_BATCH_SIZE:
+                    await flush()
+        await flush()
+        await session.commit()
+    except SQLAlchemyError:
+        await session.rollback()
+        logger.exception("bulk_import_failed", extra={"user_id": user.id})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Bulk import failed",
+        )
+
+    if inserted:
+        # Вставка шла в обход ORM — вместо событий по заметкам просим клиентов
+        # сходить в /notes/sync.
+        await note_events.publish([{"owner": user.id, "op": "sync"}])
+
+    logger.info(
+        "bulk_import_ok",
+        extra={"user_id": user.id, "inserted": inserted, "errors": len(errors)},
+    )
+    return {"inserted": inserted, "errors": errors}
+
+
+@router.post("/batch-get", response_model=NoteBatchGetOut)
+async def batch_get_notes(
+    data: NoteBatchIds,
+    user: UserPrincipal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+):
+    ids = list(dict.fromkeys(data.ids))
+    found = await get_notes_by_ids(session, user, ids)
+    if len(found) < len(ids) and retry_on_primary(session):
+        found = await get_notes_by_ids(session, user, ids)
+    missing = [i for i in ids if i not in found]
+
+    logger.info(
+        "batch_get_notes_ok",
+        extra={"user_id": user.id, "found": len(found), "missing": len(missing)},
+    )
+    return {"found": found, "missing": missing}
+
+
+@router.post("/batch-update", response_model=NoteBatchUpdateOut)
+async def batch_update_notes(
+    data: NoteBatchUpdateIn,
+    user: UserPrincipal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    items = {item.id: item for item in data.items}
+    # etag сверяем под блокировкой: иначе встречная правка успеет закоммититься
+    # между сравнением и записью.
+    notes = await get_notes_by_ids(session, user, list(items), for_update=True)
+
+    errors: dict[int, str] = {}
+    updated: list[Note] = []
+    for note_id, item in items.items():
+        note = notes.get(note_id)
+        if note is None:
+            continue
+        if item.etag and item.etag != note_etag(note):
+            errors[note_id] = "Resource has been modified"
+            continue
+        update_data = item.model_dump(exclude_unset=True, exclude={"id", "etag"})
+        if "category_id" in update_data and (
+            await category_cache.get(session, update_data["category_id"]) is None
+        ):
+            errors[note_id] = "Category does not exist"
+            continue
+        for field, value in update_data.items():
+            setattr(note, field, value)
+        updated.append(note)
+
+    await commit_or_409(session)
+    if updated:
+        # Один SELECT вместо refresh() на каждую заметку (updated_at с сервера).
+        stmt = select(Note).where(Note.id.in_([note.id for note in updated]))
+        await session.scalars(stmt.execution_options(populate_existing=True))
+
+    logger.info(
+        "batch_update_notes_ok",
+        extra={"user_id": user.id, "updated": len(updated), "errors": len(errors)},
+    )
+    return {
+        "updated": {note.id: note for note in updated},
+        "missing": [i for i in items if i not in notes],
+        "errors": errors,
+    }
+
+
+@router.post("/batch-delete", response_model=NoteBatchDeleteOut)
+async def batch_delete_notes(
+    data: NoteBatchIds,
+    user: UserPrincipal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    ids = list(dict.fromkeys(data.ids))
+    notes = await get_notes_by_ids(session, user, ids)
+    for note in notes.values():
+        await session.delete(note)
+    await session.commit()
+
+    logger.info(
+        "batch_delete_notes_ok", extra={"user_id": user.id, "deleted": len(notes)}
+    )
+    return {
+        "deleted": [i for i in ids if i in notes],
+        "missing": [i for i in ids if i not in notes],
+    }
+
+
 @router.post("/", response_model=NoteOut, status_code=status.HTTP_201_CREATED)
 async def create_note(
     data: NoteCreate,
-    user: User = Depends(get_current_user),
+    user: UserPrincipal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
     await get_category_or_400(data.category_id, session)
@@ -38,24 +432,32 @@ async def create_note(
 
 
 @router.get("/{note_id}", response_model=NoteOut)
-async def get_note(note: Note = Depends(get_note_or_404)):
+async def get_note(
+    request: Request,
+    response: Response,
+    note: Note = Depends(read_note_or_404),
+):
+    etag = note_etag(note)
+    if is_not_modified(request, etag, note.updated_at):
+        return not_modified_response(etag, note.updated_at)
+    set_validators(response, etag, note.updated_at)
     logger.info("get_note_ok", extra={"note_id": note.id, "owner_id": note.owner_id})
     return note
 
 
 @router.put("/{note_id}", response_model=NoteOut)
 async def update_note(
+    request: Request,
+    response: Response,
     data: NoteUpdate,
-    note: Note = Depends(get_note_or_404),
+    note: Note = Depends(lock_note_or_404),
     session: AsyncSession = Depends(get_session),
 ):
+    check_if_match(request, note_etag(note))
     update_data = data.model_dump(exclude_unset=True)
 
     if "category_id" in update_data:
-        r = await session.execute(
-            select(Category).where(Category.id == update_data["category_id"])
-        )
-        if not r.scalar_one_or_none():
+        if await category_cache.get(session, update_data["category_id"]) is None:
             logger.warning(
                 "update_note_bad_category",
                 extra={
@@ -72,19 +474,59 @@ async def update_note(
     for field, value in update_data.items():
         setattr(note, field, value)
 
-    await session.commit()
+    await commit_or_409(session)
     await session.refresh(note)
+    set_validators(response, note_etag(note), note.updated_at)
     return note
 
 
-
 @router.delete("/{note_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_note(
-    note: Note = Depends(get_note_or_404),
+    request: Request,
+    note: Note = Depends(lock_note_or_404),
     session: AsyncSession = Depends(get_session),
 ):
+    check_if_match(request, note_etag(note))
     await session.delete(note)
     await session.commit()
 
     logger.info("delete_note_ok", extra={"note_id": note.id, "user_id": note.owner_id})
     return None
+
+
+@router.get("/{note_id}/revisions", response_model=NoteRevisionPage)
+async def list_note_revisions(
+    before: Optional[int] = None,
+    limit: int = Query(NOTE_REVISIONS_PAGE_SIZE, ge=1, le=NOTES_PAGE_SIZE_MAX),
+    note: Note = Depends(read_note_or_404),
+    session: AsyncSession = Depends(get_read_session),
+):
+    stmt = (
+        select(NoteRevision)
+        .options(defer(NoteRevision.payload))
+        .where(NoteRevision.note_id == note.id)
+    )
+    if before is not None:
+        stmt = stmt.where(NoteRevision.version < before)
+    res = await session.scalars(
+        stmt.order_by(NoteRevision.version.desc()).limit(limit + 1)
+    )
+    items = list(res.all())
+    next_before = items[limit - 1].version if len(items) > limit else None
+    return {"items": items[:limit], "next_before": next_before}
+
+
+@router.get("/{note_id}/revisions/{version}", response_model=NoteVersionOut)
+async def get_note_version(
+    version: int,
+    note: Note = Depends(read_note_or_404),
+    session: AsyncSession = Depends(get_read_session),
+):
+    state = await load_version(session, note.id, version)
+    if state is None and retry_on_primary(session):
+        state = await load_version(session, note.id, version)
+    if state is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Revision not found"
+        )
+    return state
@@ -0,0 +1,52 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user
+from app.api.utils.pagination import encode_rank_cursor
+from app.api.utils.search_utils import search_notes_stmt
+from app.core.constants import (
+    NOTES_PAGE_SIZE_DEFAULT,
+    NOTES_PAGE_SIZE_MAX,
+    SEARCH_QUERY_MAX_LENGTH,
+)
+from app.core.user_cache import UserPrincipal
+from app.db.session import get_session, logger
+from app.schemas.note import NoteOut, NoteSearchHit, NoteSearchPage
+
+router = APIRouter()
+
+
+@router.get("/notes", response_model=NoteSearchPage)
+async def search_notes(
+    q: str = Query(..., min_length=1, max_length=SEARCH_QUERY_MAX_LENGTH),
+    cursor: Optional[str] = None,
+    limit: int = Query(NOTES_PAGE_SIZE_DEFAULT, ge=1, le=NOTES_PAGE_SIZE_MAX),
+    user: UserPrincipal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    dialect = session.get_bind().dialect.name
+    res = await session.execute(search_notes_stmt(dialect, user.id, q, cursor, limit))
+    rows = res.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_note, last_rank, _ = rows[-1]
+        next_cursor = encode_rank_cursor(float(last_rank), last_note.id)
+
+    items = [
+        NoteSearchHit(
+            **NoteOut.model_validate(note).model_dump(),
+            rank=float(rank),
+            snippet=snippet or "",
+        )
+        for note, rank, snippet in rows
+    ]
+
+    logger.info(
+        "search_notes_ok",
+        extra={"user_id": user.id, "count": len(items), "has_more": bool(next_cursor)},
+    )
+    return {"items": items, "next_cursor": next_cursor}
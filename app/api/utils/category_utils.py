@@ -1,9 +1,13 @@
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.deps import get_current_user
+from app.db.replicas import get_read_session, retry_on_primary
 from app.db.session import get_session
-from app.db.models import Category, Note, User
-from app.api.utils.db_utils import get_obj_or_404, ensure_exists_or_400
+from app.core.category_cache import CategorySnapshot, category_cache
+from app.core.user_cache import UserPrincipal
+from app.db.models import Category, Note
+from app.api.utils.db_utils import get_obj_or_404
 
 
 async def get_category_or_404(
@@ -17,7 +21,7 @@ async def get_category_or_404(
 
 async def get_note_or_404(
     note_id: int,
-    user: User = Depends(get_current_user),
+    user: UserPrincipal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> Note:
     return await get_obj_or_404(
@@ -29,10 +33,62 @@ async def get_note_or_404(
     )
 
 
+async def lock_note_or_404(
+    note_id: int,
+    user: UserPrincipal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> Note:
+    """
+    get_note_or_404 для записи: строка заблокирована до коммита, так что
+    If-Match сверяется с версией, которую запрос и перезапишет.
+    """
+    return await get_obj_or_404(
+        session,
+        Note,
+        note_id,
+        not_found_msg="Note not found",
+        allow=lambda n: (n.owner_id == user.id) or user.is_admin,
+        for_update=True,
+    )
+
+
+async def read_note_or_404(
+    note_id: int,
+    user: UserPrincipal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+) -> Note:
+    """get_note_or_404 для чтения: с реплики, при промахе — ещё раз с primary."""
+    try:
+        return await get_note_or_404(note_id, user, session)
+    except HTTPException:
+        if not retry_on_primary(session):
+            raise
+        return await get_note_or_404(note_id, user, session)
+
+
+async def get_notes_by_ids(
+    session: AsyncSession,
+    user: UserPrincipal,
+    ids: list[int],
+    for_update: bool = False,
+) -> dict[int, Note]:
+    """Пакетный get_note_or_404: один запрос WHERE id IN (...), чужие — как missing."""
+    stmt = select(Note).where(Note.id.in_(ids))
+    if not user.is_admin:
+        stmt = stmt.where(Note.owner_id == user.id)
+    if for_update:
+        # Блокируем по возрастанию id — встречные пакеты не зациклятся.
+        stmt = stmt.order_by(Note.id).with_for_update()
+    return {note.id: note for note in (await session.scalars(stmt)).all()}
+
+
 async def get_category_or_400(
     category_id: int,
     session: AsyncSession = Depends(get_session),
-) -> Category:
-    return await ensure_exists_or_400(
-        session, Category, category_id, message="Category does not exist"
-    )
+) -> CategorySnapshot:
+    category = await category_cache.get(session, category_id)
+    if category is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Category does not exist"
+        )
+    return category
@@ -1,5 +1,6 @@
 from typing import TypeVar, Type, Callable, Optional
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
@@ -16,8 +17,12 @@ async def get_obj_or_404(
     id_field: str = "id",
     allow: Optional[Callable[[ModelT], bool]] = None,
     not_found_msg: Optional[str] = None,
+    for_update: bool = False,
 ) -> ModelT:
-    res = await session.execute(select(model).where(getattr(model, id_field) == obj_id))
+    stmt = select(model).where(getattr(model, id_field) == obj_id)
+    if for_update:
+        stmt = stmt.with_for_update()
+    res = await session.execute(stmt)
     obj = res.scalar_one_or_none()
     if obj is None:
         raise HTTPException(
@@ -45,3 +50,14 @@ async def ensure_exists_or_400(
             detail=message or f"{model.__name__} does not exist",
         )
     return obj
+
+
+async def commit_or_409(
+    session: AsyncSession, message: str = "Conflicting concurrent update"
+) -> None:
+    """Коммит правки; нарушение уникальности из-за гонки — 409, а не 500."""
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=message)
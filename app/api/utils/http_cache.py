@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from starlette import status
+
+# Заметки личные: общий кэш их хранить не должен, клиент — только с ревалидацией.
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def quote_etag(tag: str) -> str:
+    return f'"{tag}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match: список тегов через запятую, слабые (W/) сравниваем как есть."""
+    if not header:
+        return False
+    candidates = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite отдаёт naive-время; пишем его как UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def row_etag(
+    obj_id: int,
+    updated_at: datetime,
+    variant: str = "",
+    version: Optional[int] = None,
+) -> str:
+    """
+    Сильный ETag по (id, updated_at). В SQLite updated_at с точностью до
+    секунды, поэтому, если у строки есть счётчик версий, он тоже идёт в тег.
+    """
+    tag = f"{obj_id}-{int(_utc(updated_at).timestamp() * 1_000_000):x}"
+    if version is not None:
+        tag = f"{tag}-v{version:x}"
+    return quote_etag(f"{tag}-{variant}" if variant else tag)
+
+
+def note_etag(note, variant: str = "") -> str:
+    # notes.seq сдвигается при каждой правке заметки (см. sync_utils).
+    return row_etag(note.id, note.updated_at, variant, version=note.seq)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_utc(value).replace(microsecond=0), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """If-None-Match важнее If-Modified-Since (RFC 9110, 13.2.2)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    since = request.headers.get("if-modified-since")
+    if not since:
+        return False
+    try:
+        since_dt = parsedate_to_datetime(since)
+    except (TypeError, ValueError):
+        return False
+    if since_dt.tzinfo is None:
+        return False
+    return _utc(last_modified).replace(microsecond=0) <= since_dt
+
+
+def not_modified_response(etag: str, last_modified: datetime) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={
+            "ETag": etag,
+            "Last-Modified": http_date(last_modified),
+            "Cache-Control": PRIVATE_REVALIDATE,
+        },
+    )
+
+
+def set_validators(response: Response, etag: str, last_modified: datetime) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Cache-Control"] = PRIVATE_REVALIDATE
+
+
+def check_if_match(request: Request, etag: str) -> None:
+    """If-Match для PUT/DELETE: 412, если клиент правит не ту версию."""
+    header = request.headers.get("if-match")
+    if not header:
+        return
+    candidates = {t.strip() for t in header.split(",")}
+    # Слабые теги в If-Match не совпадают никогда (строгое сравнение).
+    if "*" not in candidates and etag not in candidates:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has been modified",
+            headers={"ETag": etag},
+        )
@@ -0,0 +1,38 @@
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request, status
+
+from app.core.constants import NOTES_BULK_MAX_LINE_BYTES
+
+
+def _check_line(line: bytearray, max_bytes: int) -> None:
+    if len(line) > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Line is longer than {max_bytes} bytes",
+        )
+
+
+async def iter_ndjson_lines(
+    request: Request, max_line_bytes: int = NOTES_BULK_MAX_LINE_BYTES
+) -> AsyncIterator[tuple[int, str]]:
+    """
+    Читаем тело запроса потоком и отдаём (номер строки, строка).
+    В памяти — только недописанный хвост, режем только новый кусок:
+    длинная строка не копируется заново на каждом чанке.
+    """
+    tail = bytearray()
+    line_no = 0
+    async for chunk in request.stream():
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            tail += chunk[start:end]
+            _check_line(tail, max_line_bytes)
+            line_no += 1
+            yield line_no, tail.decode("utf-8", errors="replace")
+            tail.clear()
+            start = end + 1
+        tail += chunk[start:]
+        _check_line(tail, max_line_bytes)
+    if tail:
+        yield line_no + 1, tail.decode("utf-8", errors="replace")
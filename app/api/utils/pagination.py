@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, or_
+
+from app.db.models import Note
+
+
+def _pack(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _unpack(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+    )
+
+
+def encode_cursor(updated_at: datetime, note_id: int) -> str:
+    return _pack({"u": updated_at.isoformat(), "i": note_id})
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        data = _unpack(cursor)
+        return datetime.fromisoformat(data["u"]), int(data["i"])
+    except Exception:
+        raise _invalid_cursor()
+
+
+def encode_rank_cursor(rank: float, note_id: int) -> str:
+    return _pack({"r": rank, "i": note_id})
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        data = _unpack(cursor)
+        return float(data["r"]), int(data["i"])
+    except Exception:
+        raise _invalid_cursor()
+
+
+def paginate_notes(stmt: Select, cursor: Optional[str], limit: int) -> Select:
+    """
+    Keyset-пагинация по (updated_at DESC, id DESC).
+    Берём limit + 1 строк, чтобы понять, есть ли следующая страница.
+    """
+    if cursor:
+        updated_at, note_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                Note.updated_at < updated_at,
+                and_(Note.updated_at == updated_at, Note.id < note_id),
+            )
+        )
+    return stmt.order_by(Note.updated_at.desc(), Note.id.desc()).limit(limit + 1)
+
+
+def split_page(rows: list[Note], limit: int) -> tuple[list[Note], Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+    items = rows[:limit]
+    last = items[-1]
+    return items, encode_cursor(last.updated_at, last.id)
+
+
+def encode_sync_token(seq: int, issued_at: float) -> str:
+    return _pack({"s": seq, "t": int(issued_at)})
+
+
+def decode_sync_token(token: str) -> tuple[int, float]:
+    try:
+        data = _unpack(token)
+        return int(data["s"]), float(data["t"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token"
+        )
@@ -0,0 +1,85 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, column, func, literal_column, or_, select, table
+
+from app.api.utils.pagination import decode_rank_cursor
+from app.core.constants import (
+    SEARCH_HEADLINE_OPTIONS,
+    SEARCH_SNIPPET_TOKENS,
+    SEARCH_TS_CONFIG,
+)
+from app.db.models import Note
+
+notes_fts = table("notes_fts", column("rowid"))
+
+
+def _fts5_query(q: str) -> str:
+    """Каждое слово — отдельная фраза в кавычках: пользовательский ввод не
+    должен разбираться как синтаксис FTS5 (AND/OR/NEAR, звёздочки и т.п.)."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def _postgres_matches(q: str):
+    vector = literal_column("notes.search_vector")
+    query = func.websearch_to_tsquery(SEARCH_TS_CONFIG, q)
+    return (
+        select(
+            Note.id.label("note_id"),
+            func.ts_rank(vector, query).label("rank"),
+            func.ts_headline(
+                SEARCH_TS_CONFIG, Note.content, query, SEARCH_HEADLINE_OPTIONS
+            ).label("snippet"),
+        )
+        .where(vector.op("@@")(query))
+        .subquery("matches")
+    )
+
+
+def _sqlite_matches(q: str):
+    fts = literal_column("notes_fts")
+    return (
+        select(
+            notes_fts.c.rowid.label("note_id"),
+            (-func.bm25(fts)).label("rank"),
+            func.snippet(fts, 1, "<b>", "</b>", "…", SEARCH_SNIPPET_TOKENS).label(
+                "snippet"
+            ),
+        )
+        .select_from(notes_fts)
+        .where(fts.op("MATCH")(_fts5_query(q)))
+        .subquery("matches")
+    )
+
+
+def search_notes_stmt(
+    dialect: str, owner_id: int, q: str, cursor: Optional[str], limit: int
+) -> Select:
+    """
+    Ранжированный поиск по заметкам владельца.
+    Пагинация — keyset по (rank DESC, id DESC), берём limit + 1 строк.
+    """
+    if dialect == "postgresql":
+        matches = _postgres_matches(q)
+    elif dialect == "sqlite":
+        matches = _sqlite_matches(q)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Search is not supported for this database",
+        )
+
+    stmt = (
+        select(Note, matches.c.rank, matches.c.snippet)
+        .join(matches, matches.c.note_id == Note.id)
+        .where(Note.owner_id == owner_id)
+    )
+    if cursor:
+        rank, note_id = decode_rank_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                matches.c.rank < rank,
+                and_(matches.c.rank == rank, Note.id < note_id),
+            )
+        )
+    return stmt.order_by(matches.c.rank.desc(), Note.id.desc()).limit(limit + 1)
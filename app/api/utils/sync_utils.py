@@ -0,0 +1,193 @@
+"""
+Дельта-синхронизация. У каждого пользователя своя лента изменений:
+users.sync_seq — счётчик, каждое создание/изменение заметки получает
+следующий номер в notes.seq, удаление оставляет note_tombstones с seq.
+
+Номер выдаётся UPDATE ... RETURNING по строке пользователя, и она остаётся
+заблокированной до конца транзакции. Поэтому транзакции одного владельца
+коммитятся в порядке seq, и клиент, дочитавший до seq N, не пропустит
+изменение с меньшим номером, закоммиченное позже.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import delete, event, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.api.utils.pagination import encode_sync_token
+from app.core.config import settings
+from app.core.constants import NOTES_EXPORT_YIELD_PER
+from app.db.models import Note, NoteTombstone, User
+from app.schemas.note import NoteOut
+
+log = logging.getLogger("note_app.sync")
+
+_TRACKED = ("title", "content", "category_id", "owner_id")
+
+
+def _reserve_stmt(owner_id: int, count: int):
+    return (
+        update(User)
+        .where(User.id == owner_id)
+        .values(sync_seq=User.sync_seq + count)
+        .returning(User.sync_seq)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def reserve_seq(session: AsyncSession, owner_id: int, count: int) -> int:
+    """Резервирует count номеров, возвращает первый (для вставок в обход ORM)."""
+    last = (await session.execute(_reserve_stmt(owner_id, count))).scalar_one()
+    return last - count + 1
+
+
+def _owners(note: Note) -> tuple[Optional[int], Optional[int]]:
+    """
+    (прежний, текущий) владелец. До flush owner_id ещё не синхронизирован
+    с relationship: Note(owner=user) или смена владельца в админке видны
+    только через owner.
+    """
+    state = inspect(note)
+    owner = state.attrs.owner.history
+    current = owner.added[0].id if owner.added and owner.added[0] else note.owner_id
+    if state.pending:
+        return None, current
+    fk = state.attrs.owner_id.history
+    return (fk.deleted[0] if fk.deleted else note.owner_id), current
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_change_seq(session: Session, flush_context, instances) -> None:
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    # (владелец, заметка, удаление ли) — по номеру в ленте на каждую запись.
+    entries: list[tuple[int, Note, bool]] = []
+    for obj in session.new:
+        if isinstance(obj, Note):
+            entries.append((_owners(obj)[1], obj, False))
+    for obj in session.dirty:
+        if not isinstance(obj, Note):
+            continue
+        previous, current = _owners(obj)
+        if previous != current:
+            # Переезд к другому владельцу: у прежнего — удаление.
+            entries.append((previous, obj, True))
+            entries.append((current, obj, False))
+        elif any(inspect(obj).attrs[a].history.has_changes() for a in _TRACKED):
+            entries.append((current, obj, False))
+    for obj in session.deleted:
+        if isinstance(obj, Note) and obj.owner_id not in deleted_users:
+            entries.append((obj.owner_id, obj, True))
+    if not entries:
+        return
+
+    with session.no_autoflush:
+        next_seq = {}
+        for owner_id, count in Counter(e[0] for e in entries).items():
+            last = session.execute(_reserve_stmt(owner_id, count)).scalar_one()
+            next_seq[owner_id] = last - count + 1
+        for owner_id, note, removed in entries:
+            seq = next_seq[owner_id]
+            next_seq[owner_id] += 1
+            if removed:
+                session.add(NoteTombstone(note_id=note.id, owner_id=owner_id, seq=seq))
+            else:
+                note.seq = seq
+
+
+def sync_token_expired(issued_at: float) -> bool:
+    # День запаса: удаления за страницами, ещё не дочитанными клиентом,
+    # не должны успеть попасть под purge_tombstones.
+    max_age = (settings.NOTE_TOMBSTONE_RETENTION_DAYS - 1) * 86400
+    return time.time() - issued_at > max_age
+
+
+def _line(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+def _delete_line(tombstone) -> str:
+    return _line({"op": "delete", "seq": tombstone.seq, "id": tombstone.note_id})
+
+
+def _upsert_line(note: Note) -> str:
+    out = NoteOut.model_validate(note).model_dump(mode="json")
+    return _line({"op": "upsert", "seq": note.seq, "note": out})
+
+
+async def iter_changes(
+    session: AsyncSession, owner_id: int, since: int, limit: int, issued_at: float
+) -> AsyncIterator[str]:
+    """
+    NDJSON: до limit изменений с seq > since по возрастанию seq,
+    последней строкой — токен для следующего запроса. Заметки читаются
+    серверным курсором и сливаются с удалениями по seq.
+
+    issued_at — время токена, с которым пришёл клиент (или начала первой
+    синхронизации). Пока has_more, оно переносится в следующий токен:
+    недочитанные удаления старше страницы, и свежая метка дала бы токену
+    пережить их purge.
+    """
+    tombstones = []
+    if since >= 0:
+        # На первой синхронизации удалять у клиента нечего.
+        tombstones = list(
+            await session.execute(
+                select(NoteTombstone.note_id, NoteTombstone.seq)
+                .where(NoteTombstone.owner_id == owner_id, NoteTombstone.seq > since)
+                .order_by(NoteTombstone.seq)
+                .limit(limit)
+            )
+        )
+    notes = await session.stream_scalars(
+        select(Note)
+        .where(Note.owner_id == owner_id, Note.seq > since)
+        .order_by(Note.seq)
+        .limit(limit)
+        .execution_options(yield_per=NOTES_EXPORT_YIELD_PER)
+    )
+
+    emitted, last_seq, t = 0, since, 0
+    async for partition in notes.partitions():
+        chunk = []
+        for note in partition:
+            while (
+                emitted < limit
+                and t < len(tombstones)
+                and tombstones[t].seq < note.seq
+            ):
+                chunk.append(_delete_line(tombstones[t]))
+                emitted, last_seq, t = emitted + 1, tombstones[t].seq, t + 1
+            if emitted >= limit:
+                break
+            chunk.append(_upsert_line(note))
+            emitted, last_seq = emitted + 1, note.seq
+        yield "".join(chunk)
+        if emitted >= limit:
+            break
+    await notes.close()
+
+    # Обе выборки ограничены limit, после слияния берём первые limit.
+    chunk = []
+    while t < len(tombstones) and emitted < limit:
+        chunk.append(_delete_line(tombstones[t]))
+        emitted, last_seq, t = emitted + 1, tombstones[t].seq, t + 1
+    # has_more при ровно limit изменений даёт одну лишнюю пустую страницу.
+    has_more = emitted >= limit
+    token = encode_sync_token(last_seq, issued_at if has_more else time.time())
+    chunk.append(_line({"op": "end", "token": token, "has_more": has_more}))
+    yield "".join(chunk)
+
+
+async def purge_tombstones(session: AsyncSession, retention_days: int) -> int:
+    """Удаляет следы старше retention_days; более старые токены получают 410."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    res = await session.execute(
+        delete(NoteTombstone).where(NoteTombstone.created_at < cutoff)
+    )
+    await session.commit()
+    return res.rowcount or 0
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional
+
+from app.core.constants import CHAT_BROADCAST_CHANNEL
+
+from .redis_client import redis_client
+
+logger = logging.getLogger("note_app.chat")
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class BroadcastBackend(ABC):
+    """
+    Доставка событий чата между воркерами.
+    Каждый воркер публикует событие и получает события всех воркеров
+    (включая свои — отфильтровывает их сам ConnectionManager).
+    """
+
+    mode = "none"
+
+    @abstractmethod
+    async def start(self, handler: Handler) -> None: ...
+
+    @abstractmethod
+    async def stop(self) -> None: ...
+
+    @abstractmethod
+    async def publish(self, envelope: dict) -> None: ...
+
+
+class MemoryBroadcast(BroadcastBackend):
+    """Один процесс: подписчики — обработчики в этом же event loop (для тестов)."""
+
+    mode = "memory"
+
+    def __init__(self) -> None:
+        self._handlers: List[Handler] = []
+
+    async def start(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    async def stop(self) -> None:
+        self._handlers.clear()
+
+    async def publish(self, envelope: dict) -> None:
+        for handler in list(self._handlers):
+            try:
+                await handler(envelope)
+            except Exception as e:
+                logger.error(f"Memory broadcast handler error: {e}")
+
+
+class RedisBroadcast(BroadcastBackend):
+    """Redis pub/sub: любой воркер публикует, каждый раздаёт своим сокетам."""
+
+    mode = "redis"
+
+    def __init__(self, channel: str = CHAT_BROADCAST_CHANNEL) -> None:
+        self.channel = channel
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler) -> None:
+        self._task = asyncio.create_task(self._listen(handler))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, envelope: dict) -> None:
+        await redis_client.redis.publish(
+            self.channel, json.dumps(envelope, ensure_ascii=False)
+        )
+
+    async def _listen(self, handler: Handler) -> None:
+        while True:
+            pubsub = redis_client.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                logger.info(f"Subscribed to chat channel '{self.channel}'")
+                async for msg in pubsub.listen():
+                    if msg.get("type") != "message":
+                        continue
+                    try:
+                        await handler(json.loads(msg["data"]))
+                    except Exception as e:
+                        logger.error(f"Chat event handling error: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Chat subscription error: {e}; retrying")
+                await asyncio.sleep(1.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from fastapi import WebSocket
+
+from app.core.constants import CHAT_DEFAULT_ROOM
+
+logger = logging.getLogger("note_app.chat")
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_new", "disconnect")
+
+
+class ClientConnection:
+    """
+    Сокет клиента с собственной ограниченной очередью и задачей-отправителем:
+    медленный клиент копит очередь у себя и не тормозит рассылку остальным.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        nickname: str,
+        max_queue: int,
+        policy: str,
+        on_dead: Optional[Callable[["ClientConnection"], Awaitable[None]]] = None,
+        room: str = CHAT_DEFAULT_ROOM,
+    ) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.websocket = websocket
+        self.nickname = nickname
+        self.room = room
+        self.policy = policy
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_queue)
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self._on_dead = on_dead
+        self._task = asyncio.create_task(self._sender())
+
+    @property
+    def id(self) -> str:
+        return str(id(self.websocket))
+
+    def enqueue(self, text: str) -> bool:
+        """Не блокирует. False — очередь переполнена и клиента надо отключить."""
+        if self.closed:
+            return True
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.policy == "disconnect":
+                return False
+            if self.policy == "drop_oldest":
+                self.queue.get_nowait()
+                self.queue.put_nowait(text)
+            return True
+
+    async def _sender(self) -> None:
+        try:
+            while True:
+                text = await self.queue.get()
+                await self.websocket.send_text(text)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Error sending to {self.id}: {e}")
+            self.closed = True
+            if self._on_dead is not None:
+                await self._on_dead(self)
+
+    async def close(self, code: Optional[int] = None, reason: str = "") -> None:
+        self.closed = True
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        if code is not None:
+            try:
+                await self.websocket.close(code=code, reason=reason)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "nickname": self.nickname,
+            "room": self.room,
+            "queue_depth": self.queue.qsize(),
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.constants import (
+    CHAT_HISTORY_KEY,
+    CHAT_HISTORY_MAX,
+    CHAT_HISTORY_MEMORY_MAX,
+    CHAT_HISTORY_MEMORY_ROOMS,
+)
+from app.schemas.chat import ChatMessage
+
+from .redis_client import redis_client
+
+logger = logging.getLogger("note_app.chat")
+
+MESSAGE_ID_RE = re.compile(r"^\d+-\d+$")
+
+
+def _id_key(message_id: str) -> Tuple[int, int]:
+    ms, seq = message_id.split("-", 1)
+    return int(ms), int(seq)
+
+
+class ChatHistoryStore:
+    """
+    История комнат чата в Redis Streams (XADD MAXLEN ~ / XREVRANGE) с
+    in-memory fallback на deque. Id сообщений — id записей стрима
+    ("<ms>-<seq>"), по ним клиент листает историю назад и докачивает
+    пропущенное после переподключения.
+    XADD'ы уходят пайплайном; о состоянии связи судим по флагу heartbeat'а.
+    При flush_ms > 0 сообщения из всплеска склеиваются в один пайплайн.
+    """
+
+    def __init__(
+        self,
+        key: str = CHAT_HISTORY_KEY,
+        max_len: int = CHAT_HISTORY_MAX,
+        memory_max: int = CHAT_HISTORY_MEMORY_MAX,
+        flush_ms: int = settings.CHAT_HISTORY_FLUSH_MS,
+    ):
+        self.key = key
+        self.max_len = max_len
+        self.memory_max = memory_max
+        self.flush_ms = flush_ms
+        self.memory: OrderedDict[str, Deque[ChatMessage]] = OrderedDict()
+        self._pending: List[Tuple[str, ChatMessage, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_ms = 0
+        self._seq = 0
+
+    def _next_memory_id(self) -> str:
+        ms = int(time.time() * 1000)
+        if ms <= self._last_ms:
+            self._seq += 1
+        else:
+            self._last_ms, self._seq = ms, 0
+        return f"{self._last_ms}-{self._seq}"
+
+    def _room(self, room: str) -> Deque[ChatMessage]:
+        dq = self.memory.get(room)
+        if dq is None:
+            dq = self.memory[room] = deque(maxlen=self.memory_max)
+            while len(self.memory) > CHAT_HISTORY_MEMORY_ROOMS:
+                self.memory.popitem(last=False)
+        else:
+            self.memory.move_to_end(room)
+        return dq
+
+    def _remember(self, message: ChatMessage) -> str:
+        message.id = self._next_memory_id()
+        self._room(message.room).append(message)
+        return message.id
+
+    @staticmethod
+    def _decode(entry_id: str, fields: dict) -> Optional[ChatMessage]:
+        try:
+            message = ChatMessage.from_dict(json.loads(fields["data"]))
+        except Exception as e:
+            logger.error(f"Parse error: {e}")
+            return None
+        message.id = entry_id
+        return message
+
+    async def add(self, message: ChatMessage) -> str:
+        """Сохраняет сообщение и возвращает присвоенный ему id."""
+        if not redis_client.connected:
+            return self._remember(message)
+        data = json.dumps(message.to_dict(), ensure_ascii=False)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((data, message, future))
+        if self.flush_ms <= 0:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_ms / 1000)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            async with redis_client.redis.pipeline(transaction=False) as pipe:
+                for data, message, _ in batch:
+                    pipe.xadd(
+                        self.key.format(message.room),
+                        {"data": data},
+                        maxlen=self.max_len,
+                        approximate=True,
+                    )
+                ids = await pipe.execute()
+            for (_, message, future), message_id in zip(batch, ids):
+                message.id = message_id
+                if not future.done():
+                    future.set_result(message_id)
+        except Exception as e:
+            logger.error(f"Redis save error: {e}")
+            for _, message, future in batch:
+                message_id = self._remember(message)
+                if not future.done():
+                    future.set_result(message_id)
+
+    async def page(
+        self, room: str, before: Optional[str] = None, limit: int = 20
+    ) -> Tuple[List[ChatMessage], Optional[str]]:
+        """Страница истории перед `before` (старые → новые) и курсор дальше."""
+        if redis_client.connected:
+            try:
+                entries = await redis_client.redis.xrevrange(
+                    self.key.format(room),
+                    max=f"({before}" if before else "+",
+                    min="-",
+                    count=limit,
+                )
+                items = [
+                    m for m in (self._decode(i, f) for i, f in reversed(entries)) if m
+                ]
+                next_before = entries[-1][0] if len(entries) == limit else None
+                return items, next_before
+            except Exception as e:
+                logger.error(f"Redis read error: {e}")
+
+        dq = self.memory.get(room) or ()
+        border = _id_key(before) if before else None
+        older = [m for m in dq if border is None or _id_key(m.id) < border]
+        items = older[-limit:]
+        next_before = items[0].id if len(older) > limit else None
+        return items, next_before
+
+    async def recent(self, room: str, limit: int = 20) -> List[ChatMessage]:
+        items, _ = await self.page(room, None, limit)
+        return items
+
+    async def since(self, room: str, last_id: str, limit: int) -> List[ChatMessage]:
+        """Сообщения после `last_id` — для докачки при переподключении."""
+        if redis_client.connected:
+            try:
+                entries = await redis_client.redis.xrange(
+                    self.key.format(room), min=f"({last_id}", max="+", count=limit
+                )
+                return [m for m in (self._decode(i, f) for i, f in entries) if m]
+            except Exception as e:
+                logger.error(f"Redis read error: {e}")
+
+        border = _id_key(last_id)
+        dq = self.memory.get(room) or ()
+        return [m for m in dq if _id_key(m.id) > border][:limit]
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
@@ -1,91 +1,125 @@
 import json
 import logging
+import uuid
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
 from fastapi import WebSocket
 
+from app.core.config import settings
+from app.core.constants import CHAT_DEFAULT_ROOM, CHAT_HISTORY_REPLAY
 from app.schemas.chat import ChatMessage
 
-from .redis_client import redis_client
+from .broadcast import BroadcastBackend, MemoryBroadcast
+from .connection import ClientConnection
+from .history import ChatHistoryStore
 
 logger = logging.getLogger("note_app.chat")
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-        self.user_nicknames: Dict[str, str] = {}
-        self.memory_history: List[ChatMessage] = []
-
-    async def add_message_to_history(self, message: ChatMessage):
-        try:
-            if await redis_client.is_connected():
-                data = json.dumps(message.to_dict(), ensure_ascii=False)
-                await redis_client.redis.lpush("chat:history", data)
-                await redis_client.redis.ltrim("chat:history", 0, 99)
-                return
-        except Exception as e:
-            logger.error(f"Redis save error: {e}")
-        self.memory_history.append(message)
-        if len(self.memory_history) > 100:
-            self.memory_history = self.memory_history[-100:]
-
-    async def get_recent_history(self, limit: int = 20) -> List[ChatMessage]:
-        try:
-            if await redis_client.is_connected():
-                raw = await redis_client.redis.lrange("chat:history", 0, limit - 1)
-                out: List[ChatMessage] = []
-                for item in reversed(raw):
-                    try:
-                        out.append(ChatMessage.from_dict(json.loads(item)))
-                    except Exception as e:
-                        logger.error(f"Parse error: {e}")
-                return out
-        except Exception as e:
-            logger.error(f"Redis read error: {e}")
-        return self.memory_history[-limit:] if self.memory_history else []
-
-    async def connect(self, websocket: WebSocket, nickname: str):
-        ws_id = str(id(websocket))
-        self.active_connections[ws_id] = websocket
-        self.user_nicknames[ws_id] = nickname
+    def __init__(self, backend: Optional[BroadcastBackend] = None):
+        self.active_connections: Dict[str, ClientConnection] = {}
+        self.dropped_total = 0
+        self.evicted_total = 0
+        self.history = ChatHistoryStore()
+        self.node_id = uuid.uuid4().hex
+        self.backend: BroadcastBackend = backend or MemoryBroadcast()
+
+    async def start(self, backend: Optional[BroadcastBackend] = None):
+        if backend is not None:
+            self.backend = backend
+        await self.backend.start(self._on_backend_event)
+        logger.info(f"Chat broadcast backend: {self.backend.mode}")
+
+    async def stop(self):
+        await self.backend.stop()
+        await self.history.close()
+
+    async def switch_backend(self, backend: BroadcastBackend):
+        await self.backend.stop()
+        self.backend = backend
+        await self.backend.start(self._on_backend_event)
+        logger.info(f"Chat broadcast backend switched to: {self.backend.mode}")
+
+    async def _on_backend_event(self, envelope: dict):
+        # Свои события уже разосланы локально в broadcast_message.
+        if envelope.get("node") == self.node_id:
+            return
+        await self._send_local(envelope["room"], envelope["text"])
+
+    @staticmethod
+    def _encode(message: ChatMessage) -> str:
+        # Сериализуем один раз и раздаём всем одну и ту же строку.
+        return json.dumps(message.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    async def add_message_to_history(self, message: ChatMessage) -> str:
+        return await self.history.add(message)
+
+    async def get_recent_history(
+        self, limit: int = CHAT_HISTORY_REPLAY, room: str = CHAT_DEFAULT_ROOM
+    ) -> List[ChatMessage]:
+        return await self.history.recent(room, limit)
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        nickname: str,
+        room: str = CHAT_DEFAULT_ROOM,
+        last_id: Optional[str] = None,
+    ):
+        conn = ClientConnection(
+            websocket,
+            nickname,
+            max_queue=settings.CHAT_SEND_QUEUE_SIZE,
+            policy=settings.CHAT_OVERFLOW_POLICY,
+            on_dead=self._forget,
+            room=room,
+        )
+        # История уходит через ту же очередь, что и live-сообщения, чтобы
+        # сохранить порядок. С last_id докачиваем только пропущенное.
+        if last_id:
+            backlog = await self.history.since(room, last_id, conn.queue.maxsize)
+        else:
+            backlog = await self.get_recent_history(CHAT_HISTORY_REPLAY, room)
+        for msg in backlog:
+            conn.enqueue(self._encode(msg))
+        self.active_connections[conn.id] = conn
 
         logger.info(
-            f"User '{nickname}' connected. Active users: {len(self.active_connections)}"
+            f"User '{nickname}' connected to '{room}'. "
+            f"Active users: {len(self.active_connections)}"
         )
 
-        for msg in await self.get_recent_history(20):
-            try:
-                await websocket.send_json(msg.to_dict())
-            except Exception as e:
-                logger.error(f"Error sending history: {e}")
-
         join = ChatMessage(
             type="system",
             timestamp=datetime.now(timezone.utc),
             text=f"{nickname} присоединился к чату",
+            room=room,
         )
-        await self.broadcast_message(join)
         await self.add_message_to_history(join)
+        await self.broadcast_message(join)
 
     async def disconnect(self, websocket: WebSocket):
         ws_id = str(id(websocket))
-        nickname = self.user_nicknames.pop(ws_id, None)
-        self.active_connections.pop(ws_id, None)
+        conn = self.active_connections.pop(ws_id, None)
 
-        if not nickname:
+        if conn is None:
             logger.info(f"Disconnect unknown socket {ws_id}; silent drop")
             return
+        await conn.close()
+        self.dropped_total += conn.dropped
+        nickname = conn.nickname
 
         leave = ChatMessage(
             type="system",
             timestamp=datetime.now(timezone.utc),
             text=f"{nickname} покинул чат",
+            room=conn.room,
         )
         try:
-            await self.broadcast_message(leave)
             await self.add_message_to_history(leave)
+            await self.broadcast_message(leave)
         except Exception as e:
             logger.warning(f"Broadcast on disconnect failed: {e}")
 
@@ -96,31 +130,58 @@ class ConnectionManager:
     async def broadcast_message(
         self, message: ChatMessage, exclude: Optional[WebSocket] = None
     ):
-        payload = message.to_dict()
-        dead: List[str] = []
-        for ws_id, conn in list(self.active_connections.items()):
-            if exclude is not None and conn is exclude:
+        room = message.room or CHAT_DEFAULT_ROOM
+        text = self._encode(message)
+        await self._send_local(room, text, exclude)
+        try:
+            await self.backend.publish(
+                {"node": self.node_id, "room": room, "text": text}
+            )
+        except Exception as e:
+            logger.error(f"Broadcast publish error: {e}")
+
+    async def _send_local(
+        self, room: str, text: str, exclude: Optional[WebSocket] = None
+    ):
+        overflowed: List[ClientConnection] = []
+        for conn in list(self.active_connections.values()):
+            if conn.room != room:
+                continue
+            if exclude is not None and conn.websocket is exclude:
                 continue
-            try:
-                await conn.send_json(payload)
-            except Exception as e:
-                logger.warning(f"Error broadcasting to {ws_id}: {e}")
-                dead.append(ws_id)
-        for ws_id in dead:
-            self.active_connections.pop(ws_id, None)
-            self.user_nicknames.pop(ws_id, None)
+            if not conn.enqueue(text):
+                overflowed.append(conn)
+        for conn in overflowed:
+            logger.warning(f"Send queue overflow for {conn.id}; disconnecting")
+            self.evicted_total += 1
+            await self._forget(conn)
+            await conn.close(code=1013, reason="Client too slow")
+
+    async def _forget(self, conn: ClientConnection):
+        if self.active_connections.pop(conn.id, None) is not None:
+            self.dropped_total += conn.dropped
+
+    def connection_stats(self) -> dict:
+        conns = [c.stats() for c in self.active_connections.values()]
+        return {
+            "active": len(conns),
+            "dropped_total": self.dropped_total + sum(c["dropped"] for c in conns),
+            "evicted_total": self.evicted_total,
+            "connections": conns,
+        }
 
     async def handle_user_message(self, websocket: WebSocket, text: str):
-        ws_id = str(id(websocket))
-        nickname = self.user_nicknames.get(ws_id, "Гость")
+        conn = self.active_connections.get(str(id(websocket)))
+        nickname = conn.nickname if conn else "Гость"
         msg = ChatMessage(
             type="message",
             timestamp=datetime.now(timezone.utc),
             nickname=nickname,
             text=text,
+            room=conn.room if conn else CHAT_DEFAULT_ROOM,
         )
-        await self.broadcast_message(msg)
         await self.add_message_to_history(msg)
+        await self.broadcast_message(msg)
         logger.info(f"[{nickname}] {text[:50]}...")
 
 
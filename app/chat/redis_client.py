@@ -1,18 +1,36 @@
+import asyncio
 import json
 import logging
+import time
+from typing import Optional
 
 import redis.asyncio as redis
 
 from app.core.config import settings
+from app.core.metrics import REDIS_COMMAND_LATENCY
 from app.schemas.chat import ChatMessage
 
 logger = logging.getLogger("note_app.chat")
 
 
+class InstrumentedRedis(redis.Redis):
+    """Redis-клиент, который пишет латентность каждой команды в метрики."""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_LATENCY.labels(str(args[0]).upper()).observe(
+                time.perf_counter() - started
+            )
+
+
 class RedisClient:
     def __init__(self):
         self.redis = None
         self.connected = False
+        self._heartbeat_task: Optional[asyncio.Task] = None
 
     async def connect(self):
         try:
@@ -28,7 +46,10 @@ class RedisClient:
             if hasattr(settings, "REDIS_USERNAME") and settings.REDIS_USERNAME:
                 connection_params["username"] = settings.REDIS_USERNAME
 
-            self.redis = redis.Redis(**connection_params)
+            if self.redis is not None:
+                # Не бросаем старый пул открытым при повторном connect().
+                await self.redis.close()
+            self.redis = InstrumentedRedis(**connection_params)
             await self.redis.ping()
             self.connected = True
             logger.info("Successfully connected to Redis Cloud")
@@ -38,7 +59,43 @@ class RedisClient:
             self.connected = False
             raise
 
+    async def reconnect(self):
+        """
+        Повторная попытка после сбоя: клиент (и его пул) один на процесс,
+        redis-py сам переоткроет соединения — достаточно PING.
+        """
+        if self.redis is None:
+            await self.connect()
+            return
+        await self.redis.ping()
+        self.connected = True
+
+    def start_heartbeat(self, interval: float):
+        """Фоновая проверка связи вместо PING перед каждой командой."""
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat(interval))
+
+    async def _heartbeat(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            if self.redis is None:
+                continue
+            try:
+                await asyncio.wait_for(self.redis.ping(), timeout=interval)
+                if not self.connected:
+                    logger.info("Redis connection restored")
+                self.connected = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.connected:
+                    logger.error(f"Redis heartbeat failed: {e}")
+                self.connected = False
+
     async def disconnect(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
         if self.redis and self.connected:
             try:
                 await self.redis.close()
@@ -2,23 +2,49 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import secrets
 import time
-from collections import deque
-from typing import Deque, Dict
+from collections import OrderedDict, deque
+from typing import Deque, Tuple
 
+from app.chat.redis_client import redis_client
 from app.core.constants import (
-    ANTIBRUTE_MAX_ATTEMPTS, ANTIBRUTE_WINDOW_SEC,
-    ANTIBRUTE_BLOCK_SEC, ANTIBRUTE_FAIL_DELAY
+    ANTIBRUTE_ATTEMPTS_KEY,
+    ANTIBRUTE_BLOCK_KEY,
+    ANTIBRUTE_BLOCK_SEC,
+    ANTIBRUTE_FAIL_DELAY,
+    ANTIBRUTE_MAX_ATTEMPTS,
+    ANTIBRUTE_MEMORY_MAX_KEYS,
+    ANTIBRUTE_WINDOW_SEC,
 )
 
 log = logging.getLogger("admin_auth.antibrute")
 
+# Скользящее окно на sorted set: чистка, добавление, подсчёт и блокировка
+# за один round-trip. Возвращает 1, если ключ только что заблокирован.
+_FAIL_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+redis.call('ZADD', KEYS[1], now, ARGV[5])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[4])
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+redis.call('EXPIRE', KEYS[1], window)
+return 0
+"""
+
 
 class AntiBrute:
     """
-    Очень простой in-memory анти-brютфорс.
-    Считает неудачные попытки для ключа (ip|email) в окне времени.
-    При превышении порога — блокирует на BLOCK_SEC.
+    Анти-брютфорс: считает неудачные попытки для ключа (ip|email) в окне
+    времени и при превышении порога блокирует на BLOCK_SEC.
+
+    Состояние в Redis, чтобы лимит был общим для всех воркеров. Без Redis —
+    в памяти процесса, с ограничением на число ключей (LRU), чтобы перебор
+    с множества адресов не раздувал память.
     """
 
     def __init__(
@@ -27,49 +53,102 @@ class AntiBrute:
         window_sec: int = ANTIBRUTE_WINDOW_SEC,
         block_sec: int = ANTIBRUTE_BLOCK_SEC,
         fail_delay: float = ANTIBRUTE_FAIL_DELAY,
+        max_keys: int = ANTIBRUTE_MEMORY_MAX_KEYS,
     ) -> None:
         self.MAX_ATTEMPTS = max_attempts
         self.WINDOW_SEC = window_sec
         self.BLOCK_SEC = block_sec
         self.FAIL_DELAY = fail_delay
-        self._attempts: Dict[str, Deque[float]] = {}
-        self._blocked_until: Dict[str, float] = {}
+        self.MAX_KEYS = max_keys
+        # key -> (попытки, заблокирован до)
+        self._memory: OrderedDict[str, Tuple[Deque[float], float]] = OrderedDict()
+        self._script = None
+        self._script_client = None
 
     @staticmethod
     def key(ip: str | None, email: str) -> str:
         return f"{(ip or 'unknown').strip()}|{email.strip().lower()}"
 
-    def is_blocked(self, key: str, now: float | None = None) -> bool:
-        now = now or time.time()
-        return now < self._blocked_until.get(key, 0.0)
+    def _fail_script(self):
+        # Скрипт привязан к клиенту, а клиент пересоздаётся при переподключении.
+        if self._script_client is not redis_client.redis:
+            self._script = redis_client.redis.register_script(_FAIL_LUA)
+            self._script_client = redis_client.redis
+        return self._script
 
-    def _clean_old(self, key: str, now: float) -> None:
-        dq = self._attempts.get(key)
-        if not dq:
-            return
+    def _entry(self, key: str) -> Tuple[Deque[float], float]:
+        entry = self._memory.get(key)
+        if entry is None:
+            entry = (deque(), 0.0)
+            self._memory[key] = entry
+            while len(self._memory) > self.MAX_KEYS:
+                self._memory.popitem(last=False)
+        self._memory.move_to_end(key)
+        return entry
+
+    def _memory_fail(self, key: str, now: float) -> bool:
+        dq, _ = self._entry(key)
         border = now - self.WINDOW_SEC
         while dq and dq[0] <= border:
             dq.popleft()
+        dq.append(now)
+        if len(dq) >= self.MAX_ATTEMPTS:
+            dq.clear()
+            self._memory[key] = (dq, now + self.BLOCK_SEC)
+            return True
+        return False
+
+    async def is_blocked(self, key: str) -> bool:
+        if redis_client.connected:
+            try:
+                block_key = ANTIBRUTE_BLOCK_KEY.format(key)
+                return bool(await redis_client.redis.exists(block_key))
+            except Exception as e:
+                log.warning("antibrute: redis read failed: %s", e)
+        entry = self._memory.get(key)
+        return entry is not None and time.time() < entry[1]
 
     async def fail(self, key: str) -> None:
         """Отмечаем неудачу и чуть замедляем ответ (усложняет перебор)."""
         now = time.time()
-        dq = self._attempts.setdefault(key, deque())
-        self._clean_old(key, now)
-        dq.append(now)
+        blocked = None
+        if redis_client.connected:
+            try:
+                blocked = await self._fail_script()(
+                    keys=[
+                        ANTIBRUTE_ATTEMPTS_KEY.format(key),
+                        ANTIBRUTE_BLOCK_KEY.format(key),
+                    ],
+                    args=[
+                        now,
+                        self.WINDOW_SEC,
+                        self.MAX_ATTEMPTS,
+                        self.BLOCK_SEC,
+                        f"{now}:{secrets.token_hex(4)}",
+                    ],
+                )
+            except Exception as e:
+                log.warning("antibrute: redis write failed: %s", e)
+        if blocked is None:
+            blocked = self._memory_fail(key, now)
 
-        if len(dq) >= self.MAX_ATTEMPTS:
-            self._blocked_until[key] = now + self.BLOCK_SEC
-            dq.clear()
+        if blocked:
             log.warning("antibrute: BLOCK key=%s for=%ss", key, self.BLOCK_SEC)
 
         if self.FAIL_DELAY > 0:
             await asyncio.sleep(self.FAIL_DELAY)
 
-    def ok(self, key: str) -> None:
+    async def ok(self, key: str) -> None:
         """Сбрасываем счётчики на успешном входе."""
-        self._attempts.pop(key, None)
-        self._blocked_until.pop(key, None)
+        self._memory.pop(key, None)
+        if not redis_client.connected:
+            return
+        try:
+            await redis_client.redis.delete(
+                ANTIBRUTE_ATTEMPTS_KEY.format(key), ANTIBRUTE_BLOCK_KEY.format(key)
+            )
+        except Exception as e:
+            log.warning("antibrute: redis reset failed: %s", e)
 
 
 anti_brute = AntiBrute()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.chat.redis_client import redis_client
+from app.core.config import settings
+from app.db.models import Category
+
+log = logging.getLogger("note_app.category_cache")
+
+
+@dataclass(frozen=True, slots=True)
+class CategorySnapshot:
+    id: int
+    name: str
+
+
+class CategoryCache:
+    """
+    Категорий мало и меняются они только из админки, поэтому держим весь
+    список в памяти. Версия лежит в Redis (INCR при изменении), чтобы все
+    воркеры сбрасывали кэш вместе; проверяем её не чаще check_sec.
+    Без Redis версию узнать неоткуда — тогда список просто живёт local_ttl_sec.
+    """
+
+    VERSION_KEY = "categories:version"
+
+    def __init__(self, check_sec: float, local_ttl_sec: float) -> None:
+        self.check_sec = check_sec
+        self.local_ttl_sec = local_ttl_sec
+        self.etag: Optional[str] = None
+        self._items: Optional[Tuple[CategorySnapshot, ...]] = None
+        self._by_id: Dict[int, CategorySnapshot] = {}
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        # Loop держит на задачи только слабые ссылки — храним их до завершения.
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def _remote_version(self) -> Optional[int]:
+        if not redis_client.connected:
+            return None
+        try:
+            return int(await redis_client.redis.get(self.VERSION_KEY) or 0)
+        except Exception as e:
+            log.warning("category version read failed: %s", e)
+            return None
+
+    async def _load(self, session: AsyncSession) -> None:
+        # Грузим с primary: отставшая реплика закэшировала бы старый список
+        # под уже новой версией (см. app.db.replicas).
+        session.info["primary"] = True
+        res = await session.execute(
+            select(Category.id, Category.name).order_by(Category.name)
+        )
+        items = tuple(CategorySnapshot(id=cid, name=name) for cid, name in res.all())
+        self._items = items
+        self._by_id = {c.id: c for c in items}
+        self.etag = hashlib.sha1(repr(items).encode()).hexdigest()[:20]
+        self._loaded_at = time.monotonic()
+        log.debug("category cache loaded: %s items", len(items))
+
+    async def _ensure(self, session: AsyncSession) -> None:
+        now = time.monotonic()
+        if self._items is not None and now - self._checked_at < self.check_sec:
+            return
+        version = await self._remote_version()
+        self._checked_at = now
+        expired = version is None and now - self._loaded_at >= self.local_ttl_sec
+        if self._items is None or version != self._version or expired:
+            await self._load(session)
+            self._version = version
+
+    async def list(self, session: AsyncSession) -> Tuple[CategorySnapshot, ...]:
+        await self._ensure(session)
+        return self._items
+
+    async def get(
+        self, session: AsyncSession, category_id: int
+    ) -> Optional[CategorySnapshot]:
+        await self._ensure(session)
+        return self._by_id.get(category_id)
+
+    async def invalidate(self) -> None:
+        self._items = None
+        if redis_client.connected:
+            try:
+                await redis_client.redis.incr(self.VERSION_KEY)
+            except Exception as e:
+                log.warning("category version bump failed: %s", e)
+
+    def invalidate_nowait(self) -> None:
+        self._items = None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.invalidate())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+category_cache = CategoryCache(
+    settings.CATEGORY_CACHE_CHECK_SEC, settings.CATEGORY_CACHE_LOCAL_TTL_SEC
+)
+
+
+@event.listens_for(Category, "after_insert")
+@event.listens_for(Category, "after_update")
+@event.listens_for(Category, "after_delete")
+def _mark_categories_dirty(mapper, connection, target: Category) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info["categories_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # Сбрасываем только после коммита: иначе соседний запрос успеет
+    # перечитать старые данные под новой версией.
+    if session.info.pop("categories_dirty", False):
+        category_cache.invalidate_nowait()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dirty_on_rollback(session: Session) -> None:
+    session.info.pop("categories_dirty", None)
@@ -13,10 +13,66 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     SECRET_KEY: str
     ALGORITHM: str
-    ACCESS_TOKEN_EXPIRE_MINUTES: int
+    ACCESS_TOKEN_EXPIRE_MINUTES: int  # короткий: 5–15, дальше — /auth/refresh
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
 
     ADMIN_SESSION_KEY: str
 
+    USER_CACHE_BACKEND: str = "memory"  # memory | redis | none
+    USER_CACHE_TTL_SEC: int = 60
+    USER_CACHE_MAX_SIZE: int = 10_000
+
+    JWT_CACHE_SIZE: int = 10_000
+    TOKEN_VERSION_CACHE_SEC: float = 5.0  # столько может жить отозванный токен
+
+    PASSWORD_POOL_WORKERS: int = 4
+    PASSWORD_POOL_MAX_QUEUE: int = 32
+
+    CHAT_SEND_QUEUE_SIZE: int = 256
+    CHAT_OVERFLOW_POLICY: str = "drop_oldest"  # drop_oldest | drop_new | disconnect
+    CHAT_HISTORY_FLUSH_MS: int = 0  # 0 — писать сразу, >0 — склеивать пачки
+    NOTE_EVENTS_COALESCE_MS: int = 250  # окно склейки правок одной заметки
+
+    REDIS_HEARTBEAT_SEC: float = 5.0
+
+    SQL_PROFILING: bool = False
+    SQL_SLOW_QUERY_MS: int = 200
+    SQL_N_PLUS_ONE_THRESHOLD: int = 3
+
+    CATEGORY_CACHE_CHECK_SEC: float = 1.0
+    CATEGORY_CACHE_LOCAL_TTL_SEC: float = 10.0  # без Redis: правки других воркеров
+
+    READINESS_INTERVAL_SEC: float = 5.0
+    READINESS_TIMEOUT_SEC: float = 2.0
+
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SEC: float = 30.0
+    DB_POOL_RECYCLE_SEC: int = 1800
+    DB_CONNECT_TIMEOUT_SEC: float = 10.0
+    # pre-ping — лишний round-trip на каждый checkout; при False соединения
+    # проверяет фоновая задача раз в DB_LIVENESS_SEC (0 — не проверять).
+    DB_POOL_PRE_PING: bool = True
+    DB_LIVENESS_SEC: float = 15.0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PGBOUNCER: bool = False  # transaction pooling: без кэша prepared statements
+
+    DATABASE_REPLICA_URLS: str = ""  # через запятую; пусто — всё читаем с primary
+    REPLICA_MAX_LAG_SEC: float = 5.0
+    REPLICA_CHECK_SEC: float = 5.0
+    # Сколько после записи клиент читает с primary (read-your-writes).
+    REPLICA_STICKY_SEC: int = 10
+
+    # Компакция истории: удаляются версии старше N дней сверх последних K.
+    NOTE_REVISION_KEEP_LAST: int = 50
+    NOTE_REVISION_RETENTION_DAYS: int = 90
+    NOTE_TOMBSTONE_RETENTION_DAYS: int = 30  # столько живёт токен синхронизации
+
+    SESSION_BACKEND: str = "redis"  # redis | memory
+    SESSION_TTL_SEC: int = 14 * 24 * 3600
+    SESSION_MEMORY_MAX: int = 10_000
+    SESSION_HTTPS_ONLY: bool = False
+
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=False,
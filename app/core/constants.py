@@ -11,3 +11,59 @@ ANTIBRUTE_MAX_ATTEMPTS = 5
 ANTIBRUTE_WINDOW_SEC = 60
 ANTIBRUTE_BLOCK_SEC = 300
 ANTIBRUTE_FAIL_DELAY = 0.4
+ANTIBRUTE_MEMORY_MAX_KEYS = 10_000
+ANTIBRUTE_ATTEMPTS_KEY = "antibrute:attempts:{}"
+ANTIBRUTE_BLOCK_KEY = "antibrute:block:{}"
+
+RATE_LIMIT_KEY = "ratelimit:{}"
+RATE_LIMIT_MEMORY_MAX_KEYS = 10_000
+
+
+NOTES_PAGE_SIZE_DEFAULT = 50
+NOTES_PAGE_SIZE_MAX = 200
+
+SEARCH_QUERY_MAX_LENGTH = 200
+SEARCH_TS_CONFIG = "simple"
+SEARCH_HEADLINE_OPTIONS = "StartSel=<b>,StopSel=</b>,MaxFragments=2,MaxWords=20"
+SEARCH_SNIPPET_TOKENS = 16
+
+NOTES_BULK_MAX_LINES = 50_000
+# JSON-экранирование и UTF-8 раздувают текст заметки до ~6 байт на символ.
+NOTES_BULK_MAX_LINE_BYTES = 8 * NOTE_CONTENT_MAX_LENGTH
+NOTES_BULK_BATCH_SIZE = 1_000
+NOTES_EXPORT_YIELD_PER = 1_000
+NOTES_BATCH_MAX_IDS = 500
+NOTES_SYNC_PAGE_SIZE = 1_000
+NOTES_SYNC_PAGE_SIZE_MAX = 5_000
+
+NOTE_EVENTS_CHANNEL = "notes:events"
+NOTE_EVENTS_QUEUE_SIZE = 256
+NOTE_EVENTS_REPLAY_MAX = 1_000  # больше — клиенту отправляется {"op": "sync"}
+NOTE_EVENTS_HEARTBEAT_SEC = 15
+
+NOTE_REVISION_SNAPSHOT_EVERY = 20  # не больше 19 дельт на восстановление версии
+NOTE_REVISIONS_PAGE_SIZE = 50
+
+TOKEN_VERSION_KEY = "user:token_version:{}"
+TOKEN_VERSION_REDIS_TTL_SEC = 300
+
+DENYLIST_KEY = "auth:deny:{}"
+REFRESH_USED_KEY = "auth:refresh-used:{}"
+DENYLIST_CHANNEL = "auth:revoked"
+DENYLIST_BLOOM_CAPACITY = 100_000
+DENYLIST_BLOOM_ERROR_RATE = 0.01  # ~117 КБ на процесс
+DENYLIST_BLOOM_REBUILD_SEC = 3600
+
+SESSION_COOKIE_NAME = "sid"
+SESSION_KEY = "session:{}"
+SESSION_USER_KEY = "session:user:{}"
+
+CHAT_BROADCAST_CHANNEL = "chat:events"
+CHAT_HISTORY_KEY = "chat:room:{}:stream"
+CHAT_HISTORY_MAX = 10_000
+CHAT_HISTORY_MEMORY_MAX = 1_000
+CHAT_HISTORY_MEMORY_ROOMS = 100
+CHAT_HISTORY_REPLAY = 20
+CHAT_HISTORY_PAGE_MAX = 200
+CHAT_DEFAULT_ROOM = "general"
+CHAT_ROOM_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
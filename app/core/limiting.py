@@ -1,4 +1,122 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+"""
+Лимиты запросов: @limiter.limit("5/minute") на async-ручке с параметром
+request. Скользящее окно в Redis (Lua, один round-trip через общий
+асинхронный клиент), поэтому лимит общий для всех воркеров и медленный
+Redis не блокирует event loop. Пока Redis недоступен — окно в памяти
+процесса, с ограничением на число ключей.
+"""
+from __future__ import annotations
 
-limiter = Limiter(key_func=get_remote_address, default_limits=[])
+import functools
+import logging
+import re
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Deque
+
+from fastapi import HTTPException, Request, status
+
+from app.chat.redis_client import redis_client
+from app.core.constants import RATE_LIMIT_KEY, RATE_LIMIT_MEMORY_MAX_KEYS
+
+log = logging.getLogger("note_app.limiting")
+
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(second|minute|hour|day)s?\s*$")
+
+# Возвращает 0, если запрос пропущен, иначе — через сколько секунд повторить.
+_HIT_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return math.max(1, math.ceil(tonumber(oldest[2]) + window - now))
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('EXPIRE', KEYS[1], window)
+return 0
+"""
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """Строка вида "5/minute" -> (5, 60)."""
+    match = _RATE_RE.match(rate)
+    if match is None:
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+    return int(match.group(1)), _UNITS[match.group(2)]
+
+
+class RateLimiter:
+    def __init__(self, max_keys: int = RATE_LIMIT_MEMORY_MAX_KEYS) -> None:
+        self.enabled = True
+        self.max_keys = max_keys
+        self._memory: OrderedDict[str, Deque[float]] = OrderedDict()
+        self._script = None
+        self._script_client = None
+
+    def _hit_script(self):
+        # Скрипт привязан к клиенту, а клиент пересоздаётся при переподключении.
+        if self._script_client is not redis_client.redis:
+            self._script = redis_client.redis.register_script(_HIT_LUA)
+            self._script_client = redis_client.redis
+        return self._script
+
+    def _memory_hit(self, key: str, limit: int, window: int, now: float) -> int:
+        dq = self._memory.get(key)
+        if dq is None:
+            dq = self._memory[key] = deque()
+            while len(self._memory) > self.max_keys:
+                self._memory.popitem(last=False)
+        self._memory.move_to_end(key)
+        while dq and dq[0] <= now - window:
+            dq.popleft()
+        if len(dq) >= limit:
+            return max(1, int(dq[0] + window - now + 0.999))
+        dq.append(now)
+        return 0
+
+    async def hit(self, key: str, limit: int, window: int) -> int:
+        """0 — пропустить, иначе Retry-After в секундах."""
+        now = time.time()
+        if redis_client.connected:
+            try:
+                return int(
+                    await self._hit_script()(
+                        keys=[RATE_LIMIT_KEY.format(key)],
+                        args=[now, window, limit, f"{now}:{secrets.token_hex(4)}"],
+                    )
+                )
+            except Exception as e:
+                log.warning("rate limit: redis failed: %s", e)
+        return self._memory_hit(key, limit, window, now)
+
+    def limit(self, rate: str):
+        limit, window = parse_rate(rate)
+
+        def decorator(func):
+            scope = f"{func.__module__}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = kwargs.get("request")
+                if request is None:
+                    request = next((a for a in args if isinstance(a, Request)), None)
+                if self.enabled and request is not None:
+                    ip = request.client.host if request.client else "unknown"
+                    retry_after = await self.hit(f"{scope}:{ip}", limit, window)
+                    if retry_after:
+                        raise HTTPException(
+                            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail=f"Rate limit exceeded: {rate}",
+                            headers={"Retry-After": str(retry_after)},
+                        )
+                return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+
+limiter = RateLimiter()
@@ -0,0 +1,122 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests in progress", multiprocess_mode="livesum"
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, float("inf")),
+)
+DB_QUERY_LATENCY = Histogram("db_query_duration_seconds", "SQL statement latency")
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection"
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Pool size", multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections in use", multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Overflow connections", multiprocess_mode="livesum"
+)
+
+REDIS_COMMAND_LATENCY = Histogram(
+    "redis_command_duration_seconds", "Redis command latency", ["command"]
+)
+
+CHAT_CONNECTIONS = Gauge(
+    "chat_websocket_connections",
+    "Active chat websocket connections",
+    multiprocess_mode="livesum",
+)
+CHAT_DROPPED = Gauge(
+    "chat_send_dropped", "Chat messages dropped on overflow", multiprocess_mode="sum"
+)
+USER_CACHE_EVENTS = Gauge(
+    "user_cache_events",
+    "User principal cache counters",
+    ["event"],
+    multiprocess_mode="sum",
+)
+PASSWORD_POOL = Gauge(
+    "password_pool",
+    "Password hashing pool state",
+    ["field"],
+    multiprocess_mode="livesum",
+)
+
+
+@dataclass
+class RequestDbStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# Статистика SQL текущего запроса; заполняется событиями движка.
+request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar(
+    "request_db_stats", default=None
+)
+
+
+def observe_query(seconds: float) -> None:
+    DB_QUERY_LATENCY.observe(seconds)
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += seconds
+
+
+def _route_label(scope: Scope) -> str:
+    # Шаблон пути ("/notes/{note_id}"), а не сам путь — иначе взрыв кардинальности.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Латентность, статусы, in-flight и число SQL на HTTP-запрос."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestDbStats()
+        token = request_db_stats.set(stats)
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            request_db_stats.reset(token)
+            route = _route_label(scope)
+            method = scope["method"]
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
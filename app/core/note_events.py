@@ -0,0 +1,258 @@
+"""
+Живая лента изменений заметок пользователя (SSE и websocket).
+
+События пишутся в ORM-хуках (after_flush) и уходят после коммита через тот
+же BroadcastBackend, что и чат: Redis pub/sub между воркерами или память
+процесса. Каждый воркер раздаёт событие своим подписчикам владельца.
+
+Событие — {"op", "id", "seq"}, где seq — номер из ленты синхронизации
+(sync_utils), он же id события. Клиент, переподключаясь с Last-Event-ID,
+получает пропущенное из БД; если пропущено слишком много — одно событие
+{"op": "sync"}: пора сходить в /notes/sync. Частые правки одной заметки
+склеиваются в окне NOTE_EVENTS_COALESCE_MS.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.chat.broadcast import BroadcastBackend, MemoryBroadcast
+from app.core.config import settings
+from app.core.constants import NOTE_EVENTS_QUEUE_SIZE, NOTE_EVENTS_REPLAY_MAX
+from app.db.models import Note, NoteTombstone
+
+log = logging.getLogger("note_app.note_events")
+
+SYNC_EVENT = {"op": "sync"}
+
+
+def _merge(prev: dict, new: dict) -> dict:
+    # created + updated в одном окне — для клиента это всё ещё created.
+    if prev["op"] == "created" and new["op"] == "updated":
+        return {**new, "op": "created"}
+    return new
+
+
+class NoteSubscriber:
+    """Одно SSE/ws-подключение: склейка событий и ограниченная очередь."""
+
+    def __init__(self, owner_id: int, coalesce_sec: float) -> None:
+        self.owner_id = owner_id
+        self.coalesce_sec = coalesce_sec
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(
+            maxsize=NOTE_EVENTS_QUEUE_SIZE
+        )
+        self.overflowed = 0
+        # Живые события с seq <= replayed_seq уже отданы из БД.
+        self.replayed_seq = -1
+        self._pending: OrderedDict[object, dict] = OrderedDict()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def push(self, evt: dict) -> None:
+        key = evt.get("id", evt["op"])
+        prev = self._pending.get(key)
+        self._pending[key] = evt if prev is None else _merge(prev, evt)
+        if self.coalesce_sec <= 0:
+            self._flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.coalesce_sec, self._flush)
+
+    def put(self, evt: dict) -> None:
+        try:
+            self.queue.put_nowait(evt)
+        except asyncio.QueueFull:
+            # Клиент не успевает: вместо потерянных событий — одна команда
+            # на полную синхронизацию.
+            self.overflowed += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(SYNC_EVENT)
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        pending, self._pending = self._pending, OrderedDict()
+        for evt in pending.values():
+            if evt.get("seq") is None or evt["seq"] > self.replayed_seq:
+                self.put(evt)
+
+    def close(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+
+class NoteEventHub:
+    def __init__(self, coalesce_ms: int) -> None:
+        self.coalesce_sec = coalesce_ms / 1000
+        self.backend: BroadcastBackend = MemoryBroadcast()
+        self.subscribers: Dict[int, Set[NoteSubscriber]] = defaultdict(set)
+        # Loop держит на задачи только слабые ссылки — храним их до завершения.
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self, backend: Optional[BroadcastBackend] = None) -> None:
+        if backend is not None:
+            self.backend = backend
+        await self.backend.start(self._on_backend_event)
+        log.info(f"Note events backend: {self.backend.mode}")
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    async def switch_backend(self, backend: BroadcastBackend) -> None:
+        await self.backend.stop()
+        self.backend = backend
+        await self.backend.start(self._on_backend_event)
+        log.info(f"Note events backend switched to: {self.backend.mode}")
+
+    async def _on_backend_event(self, envelope: dict) -> None:
+        # Свои события тоже приходят через backend — локальной рассылки нет.
+        for evt in envelope["events"]:
+            for sub in list(self.subscribers.get(evt["owner"], ())):
+                sub.push({k: v for k, v in evt.items() if k != "owner"})
+
+    async def publish(self, events: List[dict]) -> None:
+        envelope = {"events": events}
+        try:
+            await self.backend.publish(envelope)
+        except Exception as e:
+            log.error(f"Note events publish error: {e}")
+            await self._on_backend_event(envelope)
+
+    def publish_nowait(self, events: List[dict]) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.publish(events))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error(f"Note events publish task failed: {task.exception()}")
+
+    def subscribe(self, owner_id: int) -> NoteSubscriber:
+        sub = NoteSubscriber(owner_id, self.coalesce_sec)
+        self.subscribers[owner_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: NoteSubscriber) -> None:
+        sub.close()
+        subs = self.subscribers.get(sub.owner_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                self.subscribers.pop(sub.owner_id, None)
+
+    async def replay(
+        self, session: AsyncSession, sub: NoteSubscriber, since: int
+    ) -> None:
+        """
+        Докачка после Last-Event-ID. Подписка уже оформлена, так что живые
+        события за время чтения не теряются, а повторы отсекает replayed_seq.
+        """
+        # Больше, чем влезает в очередь, не докачиваем: переполнение дало бы
+        # SYNC и следом обрезанный хвост событий.
+        limit = min(NOTE_EVENTS_REPLAY_MAX, sub.queue.maxsize - 1)
+        notes = (
+            await session.execute(
+                select(Note.id, Note.seq)
+                .where(Note.owner_id == sub.owner_id, Note.seq > since)
+                .order_by(Note.seq)
+                .limit(limit + 1)
+            )
+        ).all()
+        tombstones = (
+            await session.execute(
+                select(NoteTombstone.note_id, NoteTombstone.seq)
+                .where(
+                    NoteTombstone.owner_id == sub.owner_id,
+                    NoteTombstone.seq > since,
+                )
+                .order_by(NoteTombstone.seq)
+                .limit(limit + 1)
+            )
+        ).all()
+        if len(notes) + len(tombstones) > limit:
+            sub.put(SYNC_EVENT)
+            return
+        # Создание от правки по БД не отличить — при докачке всё "updated".
+        events = [{"op": "updated", "id": i, "seq": s} for i, s in notes]
+        events += [{"op": "deleted", "id": i, "seq": s} for i, s in tombstones]
+        events.sort(key=lambda e: e["seq"])
+        for evt in events:
+            sub.put(evt)
+        if events:
+            sub.replayed_seq = events[-1]["seq"]
+
+    def stats(self) -> dict:
+        subs = [s for group in self.subscribers.values() for s in group]
+        return {
+            "backend": self.backend.mode,
+            "subscribers": len(subs),
+            "overflowed_total": sum(s.overflowed for s in subs),
+        }
+
+
+note_events = NoteEventHub(settings.NOTE_EVENTS_COALESCE_MS)
+
+
+def encode_sse(evt: dict) -> str:
+    data = json.dumps(evt, ensure_ascii=False, separators=(",", ":"))
+    if evt.get("seq") is None:
+        return f"event: note\ndata: {data}\n\n"
+    return f"id: {evt['seq']}\nevent: note\ndata: {data}\n\n"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_note_events(session: Session, flush_context) -> None:
+    # После flush id новых заметок известны, а new/dirty/deleted ещё не сброшены.
+    tombstones = {
+        obj.note_id: obj for obj in session.new if isinstance(obj, NoteTombstone)
+    }
+
+    def note_event(op: str, note_id: int, seq: int, owner_id: int) -> dict:
+        return {"op": op, "id": note_id, "seq": seq, "owner": owner_id}
+
+    events = []
+    for obj in session.new:
+        if isinstance(obj, Note):
+            events.append(note_event("created", obj.id, obj.seq, obj.owner_id))
+    for obj in session.dirty:
+        if not isinstance(obj, Note):
+            continue
+        moved = tombstones.get(obj.id)
+        if moved is not None:
+            # Переезд к другому владельцу: прежний видит удаление, новый — создание.
+            events.append(note_event("deleted", obj.id, moved.seq, moved.owner_id))
+            events.append(note_event("created", obj.id, obj.seq, obj.owner_id))
+        elif inspect(obj).attrs.seq.history.has_changes():
+            events.append(note_event("updated", obj.id, obj.seq, obj.owner_id))
+    for obj in session.deleted:
+        if isinstance(obj, Note) and obj.id in tombstones:
+            t = tombstones[obj.id]
+            events.append(note_event("deleted", obj.id, t.seq, t.owner_id))
+    if not events:
+        return
+    session.info.setdefault("note_events", []).extend(events)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    events = session.info.pop("note_events", None)
+    if events:
+        note_events.publish_nowait(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_events_on_rollback(session: Session) -> None:
+    session.info.pop("note_events", None)
@@ -0,0 +1,150 @@
+"""
+Профилирование SQL по запросам: число и время стейтментов, медленные
+запросы с маршрутом, повторы одной и той же формы запроса (N+1).
+
+В приложении включается SQL_PROFILING=true (middleware), в тестах —
+контекстным менеджером:
+
+    with assert_max_queries(2):
+        await client.get("/api/v1/notes/notes/1", headers=auth)
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger("note_app.sql")
+
+_PLACEHOLDER_LIST = re.compile(r"(\?|%s|\$\d+|:\w+)(\s*,\s*(\?|%s|\$\d+|:\w+))+")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL без литералов и с IN-списками любой длины, сведёнными к одному виду."""
+    shape = _SPACES.sub(" ", statement).strip()
+    shape = _PLACEHOLDER_LIST.sub("?, ...", shape)
+    return _NUMBER.sub("N", shape)
+
+
+@dataclass
+class QueryProfile:
+    scope: Optional[Scope] = None
+    count: int = 0
+    seconds: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    slow: List[Tuple[float, str]] = field(default_factory=list)
+
+    @property
+    def route(self) -> str:
+        route = (self.scope or {}).get("route")
+        return getattr(route, "path", None) or "-"
+
+    def n_plus_one(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(s, n) for s, n in self.shapes.most_common() if n >= threshold]
+
+    def merge(self, other: "QueryProfile") -> None:
+        self.count += other.count
+        self.seconds += other.seconds
+        self.shapes.update(other.shapes)
+        self.slow.extend(other.slow)
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def record_query(statement: str, seconds: float) -> None:
+    profile = current_profile.get()
+    if profile is None:
+        return
+    profile.count += 1
+    profile.seconds += seconds
+    profile.shapes[statement_shape(statement)] += 1
+    if seconds * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        profile.slow.append((seconds, statement))
+        logger.warning(
+            "sql_slow route=%s ms=%.1f sql=%s",
+            profile.route,
+            seconds * 1000,
+            _SPACES.sub(" ", statement)[:500],
+        )
+
+
+@contextmanager
+def profile_queries(scope: Optional[Scope] = None) -> Iterator[QueryProfile]:
+    """Собирает статистику SQL внутри блока; вложенные профили суммируются."""
+    outer = current_profile.get()
+    profile = QueryProfile(scope=scope)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+        if outer is not None:
+            outer.merge(profile)
+
+
+@contextmanager
+def assert_max_queries(budget: int) -> Iterator[QueryProfile]:
+    with profile_queries() as profile:
+        yield profile
+    if profile.count > budget:
+        shapes = "\n".join(f"  {n}x {s}" for s, n in profile.shapes.most_common())
+        raise AssertionError(
+            f"Expected at most {budget} queries, got {profile.count}:\n{shapes}"
+        )
+
+
+def _log_summary(profile: QueryProfile) -> None:
+    for shape, n in profile.n_plus_one(settings.SQL_N_PLUS_ONE_THRESHOLD):
+        logger.warning(
+            "sql_n_plus_one route=%s repeats=%s sql=%s", profile.route, n, shape[:500]
+        )
+    logger.debug(
+        "sql_summary route=%s queries=%s ms=%.1f",
+        profile.route,
+        profile.count,
+        profile.seconds * 1000,
+    )
+
+
+class QueryProfilingMiddleware:
+    """Профиль SQL на каждый HTTP-запрос; в APP_DEBUG — заголовок X-DB-Queries."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries(scope) as profile:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and settings.APP_DEBUG:
+                    threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+                    repeats = len(profile.n_plus_one(threshold))
+                    value = (
+                        f"count={profile.count}; "
+                        f"time_ms={profile.seconds * 1000:.1f}; "
+                        f"n_plus_one={repeats}"
+                    )
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", value.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                _log_summary(profile)
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.chat.broadcast import RedisBroadcast
+from app.chat.manager import manager
+from app.chat.redis_client import redis_client
+from app.core.config import settings
+from app.core.constants import NOTE_EVENTS_CHANNEL
+from app.core.note_events import note_events
+from app.core.revocation import denylist
+from app.db.replicas import replica_set
+from app.db.session import engine, pool_stats
+
+log = logging.getLogger("note_app.readiness")
+
+
+class ReadinessProbe:
+    """
+    Проверяет БД и Redis в фоне раз в interval секунд; /ready отдаёт
+    последний результат, так что частые пробы оркестратора не нагружают
+    зависимости. Заодно переподключает Redis, если на старте его не было.
+    """
+
+    def __init__(self, interval: float, timeout: float) -> None:
+        self.interval = interval
+        self.timeout = timeout
+        self.state: dict = {"ready": False, "checked_at": None}
+        self._app: Optional[FastAPI] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, app: FastAPI) -> None:
+        self._app = app
+        await self.check()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                log.error("readiness check failed: %s", e)
+
+    async def _probe_db(self) -> dict:
+        out = {"ok": False, "latency_ms": None, "pool": pool_stats()}
+        if replica_set.enabled:
+            out["replicas"] = replica_set.stats()
+        started = time.perf_counter()
+        try:
+            async with engine.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), self.timeout)
+            out["ok"] = True
+            out["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        except Exception as e:
+            out["error"] = str(e)
+        return out
+
+    async def _reattach_redis(self) -> None:
+        try:
+            await asyncio.wait_for(redis_client.reconnect(), self.timeout)
+        except Exception:
+            return
+        log.info("Redis is back; switching chat to Redis broadcast")
+        redis_client.start_heartbeat(settings.REDIS_HEARTBEAT_SEC)
+        self._app.state.redis_available = True
+        if manager.backend.mode != "redis":
+            await manager.switch_backend(RedisBroadcast())
+        if note_events.backend.mode != "redis":
+            await note_events.switch_backend(RedisBroadcast(NOTE_EVENTS_CHANNEL))
+        await denylist.start()
+
+    async def _probe_redis(self) -> dict:
+        if not self._app.state.redis_available:
+            await self._reattach_redis()
+        out = {"ok": False, "latency_ms": None}
+        if not self._app.state.redis_available:
+            return out
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(redis_client.redis.ping(), self.timeout)
+            out["ok"] = True
+            out["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        except Exception as e:
+            out["error"] = str(e)
+        redis_client.connected = out["ok"]
+        return out
+
+    async def check(self) -> dict:
+        db, redis = await asyncio.gather(self._probe_db(), self._probe_redis())
+        self.state = {
+            # Redis опционален (есть in-memory режим), поэтому на ready не влияет.
+            "ready": db["ok"],
+            "status": "ok" if db["ok"] and redis["ok"] else "degraded",
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "db": db,
+            "redis": redis,
+            "chat": {
+                "backend": manager.backend.mode,
+                "connections": len(manager.active_connections),
+            },
+            "note_events": note_events.stats(),
+        }
+        return self.state
+
+
+readiness = ReadinessProbe(
+    settings.READINESS_INTERVAL_SEC, settings.READINESS_TIMEOUT_SEC
+)
@@ -0,0 +1,184 @@
+"""
+Отзыв токенов. Отозванные id (jti токена или семейство refresh-токенов)
+лежат в Redis с TTL до истечения токена. Перед Redis — bloom-фильтр в памяти
+процесса: для неотозванного токена (почти всегда) проверка не выходит в сеть.
+
+Фильтры воркеров синхронизируются через pub/sub; раз в
+DENYLIST_BLOOM_REBUILD_SEC фильтр пересобирается из Redis, чтобы истёкшие
+записи не копили ложные срабатывания.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Dict, Iterable, Optional
+
+from app.chat.broadcast import RedisBroadcast
+from app.chat.redis_client import redis_client
+from app.core.constants import (
+    DENYLIST_BLOOM_CAPACITY,
+    DENYLIST_BLOOM_ERROR_RATE,
+    DENYLIST_BLOOM_REBUILD_SEC,
+    DENYLIST_CHANNEL,
+    DENYLIST_KEY,
+    REFRESH_USED_KEY,
+)
+
+log = logging.getLogger("note_app.revocation")
+
+
+def _with_entry(store: Dict[str, float], key: str, ttl: float) -> Dict[str, float]:
+    now = time.time()
+    if len(store) > DENYLIST_BLOOM_CAPACITY:
+        store = {k: v for k, v in store.items() if v > now}
+    store[key] = now + ttl
+    return store
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Двойное хеширование: k позиций из одного blake2b.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little")
+        b = int.from_bytes(digest[8:], "little") | 1
+        return ((a + i * b) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class TokenDenylist:
+    def __init__(self) -> None:
+        self._bloom = self._new_bloom()
+        # Без Redis (и как запасной вариант) — id -> время истечения.
+        self._memory: Dict[str, float] = {}
+        # Использованные refresh-jti без Redis. В фильтр они не попадают:
+        # через него проверяются только отозванные id.
+        self._used: Dict[str, float] = {}
+        self._broadcast: Optional[RedisBroadcast] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _new_bloom() -> BloomFilter:
+        return BloomFilter(DENYLIST_BLOOM_CAPACITY, DENYLIST_BLOOM_ERROR_RATE)
+
+    def _remember(self, token_id: str, ttl: float) -> None:
+        self._memory = _with_entry(self._memory, token_id, ttl)
+        self._bloom.add(token_id)
+
+    async def is_denied(
+        self, *token_ids: Optional[str], skip_bloom: bool = False
+    ) -> bool:
+        """
+        skip_bloom — всегда спрашивать Redis: фильтр воркера, пропустившего
+        сообщение pub/sub, не знает об отзыве до следующей пересборки.
+        """
+        candidates = [t for t in token_ids if t and (skip_bloom or t in self._bloom)]
+        if not candidates:
+            return False
+        if redis_client.connected:
+            try:
+                keys = [DENYLIST_KEY.format(t) for t in candidates]
+                return bool(await redis_client.redis.exists(*keys))
+            except Exception as e:
+                log.warning("denylist read failed: %s", e)
+        now = time.time()
+        return any(self._memory.get(t, 0.0) > now for t in candidates)
+
+    async def deny(self, token_id: str, ttl: int) -> None:
+        ttl = max(1, ttl)
+        if redis_client.connected:
+            try:
+                await redis_client.redis.set(DENYLIST_KEY.format(token_id), 1, ex=ttl)
+                await self._broadcast_id(token_id, ttl)
+            except Exception as e:
+                log.warning("denylist write failed: %s", e)
+        self._remember(token_id, ttl)
+
+    async def claim(self, token_id: str, ttl: int) -> bool:
+        """
+        Атомарно помечает одноразовый id использованным (SET NX).
+        False — его уже использовали: повторное предъявление refresh-токена.
+        """
+        ttl = max(1, ttl)
+        if redis_client.connected:
+            try:
+                return bool(
+                    await redis_client.redis.set(
+                        REFRESH_USED_KEY.format(token_id), 1, ex=ttl, nx=True
+                    )
+                )
+            except Exception as e:
+                log.warning("refresh claim failed: %s", e)
+        if self._used.get(token_id, 0.0) > time.time():
+            return False
+        self._used = _with_entry(self._used, token_id, ttl)
+        return True
+
+    async def _broadcast_id(self, token_id: str, ttl: int) -> None:
+        if self._broadcast is not None:
+            await self._broadcast.publish({"id": token_id, "ttl": ttl})
+
+    async def _on_revoked(self, envelope: dict) -> None:
+        self._remember(envelope["id"], envelope["ttl"])
+
+    async def rebuild(self) -> None:
+        bloom = self._new_bloom()
+        if redis_client.connected:
+            prefix = DENYLIST_KEY.format("")
+            async for key in redis_client.redis.scan_iter(match=prefix + "*"):
+                bloom.add(key[len(prefix) :])
+        # Память — после SCAN и без await до подмены: отзывы, пришедшие
+        # сообщением во время сканирования, не выпадут из нового фильтра.
+        now = time.time()
+        for token_id, expires in self._memory.items():
+            if expires > now:
+                bloom.add(token_id)
+        self._bloom = bloom
+
+    async def _rebuild_loop(self) -> None:
+        while True:
+            await asyncio.sleep(DENYLIST_BLOOM_REBUILD_SEC)
+            try:
+                await self.rebuild()
+            except Exception as e:
+                log.warning("denylist rebuild failed: %s", e)
+
+    async def start(self) -> None:
+        """Подписка на отзывы других воркеров; вызывать, когда Redis доступен."""
+        if self._broadcast is not None:
+            return
+        # Сначала подписка, потом SCAN: отзыв между ними придёт сообщением,
+        # а не потеряется до следующей пересборки.
+        self._broadcast = RedisBroadcast(DENYLIST_CHANNEL)
+        await self._broadcast.start(self._on_revoked)
+        await self.rebuild()
+        self._rebuild_task = asyncio.create_task(self._rebuild_loop())
+
+    async def stop(self) -> None:
+        if self._broadcast is not None:
+            await self._broadcast.stop()
+            self._broadcast = None
+        if self._rebuild_task is not None:
+            self._rebuild_task.cancel()
+            try:
+                await self._rebuild_task
+            except asyncio.CancelledError:
+                pass
+            self._rebuild_task = None
+
+
+denylist = TokenDenylist()
@@ -1,5 +1,9 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
 
+from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from passlib.context import CryptContext
@@ -19,11 +23,88 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_ctx.verify(plain, hashed)
 
 
-def create_access_token(sub: str | int, minutes: int | None = None) -> str:
+class PasswordPool:
+    """
+    Отдельный пул потоков под bcrypt (~250 мс CPU на вызов), чтобы не блокировать
+    event loop. bcrypt отпускает GIL, поэтому потоков достаточно.
+    Если в работе и в очереди уже workers + max_queue задач — отвечаем 503.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Создаём лениво: после shutdown() (конец lifespan) следующий
+        # lifespan в том же процессе — тесты, reload — получит новый пул.
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password"
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(self._get_executor(), fn, *args)
+        self.in_flight += 1
+        fut.add_done_callback(self._release)
+        # Клиент отключился — поток всё равно досчитает bcrypt, поэтому слот
+        # освобождается по завершении задачи в пуле, а не ожидающего запроса.
+        return await asyncio.shield(fut)
+
+    def _release(self, fut: asyncio.Future) -> None:
+        self.in_flight -= 1
+        if not fut.cancelled() and fut.exception() is None:
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.workers),
+            "utilization": min(self.in_flight, self.workers) / self.workers,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordPool(
+    settings.PASSWORD_POOL_WORKERS, settings.PASSWORD_POOL_MAX_QUEUE
+)
+
+
+async def hash_password_async(plain: str) -> str:
+    return await password_pool.run(hash_password, plain)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await password_pool.run(verify_password, plain, hashed)
+
+
+def create_access_token(
+    sub: str | int, minutes: int | None = None, claims: dict | None = None
+) -> str:
     expire = datetime.now(timezone.utc) + timedelta(
         minutes=minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
-    payload = {"sub": str(sub), "exp": expire}
+    payload = {**(claims or {}), "sub": str(sub), "exp": expire}
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
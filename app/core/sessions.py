@@ -0,0 +1,286 @@
+"""
+Серверные сессии для UI. В cookie лежит только случайный id, данные — в
+Redis (или в памяти процесса для тестов и работы без Redis). TTL скользящий:
+каждое обращение продлевает запись и cookie.
+
+Сессии пользователя можно отозвать целиком (revoke_user) — это же делается
+при изменении/удалении пользователя, чтобы закэшированный в сессии
+принципал не устаревал.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import secrets
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.chat.redis_client import redis_client
+from app.core.config import settings
+from app.core.constants import SESSION_COOKIE_NAME, SESSION_KEY, SESSION_USER_KEY
+from app.db.models import User
+
+log = logging.getLogger("note_app.sessions")
+
+# При смене этих ключей (вход/выход) id сессии выдаётся заново.
+_AUTH_KEYS = ("user_id",)
+
+
+class SessionStore(ABC):
+    def __init__(self) -> None:
+        # Loop держит на задачи только слабые ссылки — храним их до завершения.
+        self._tasks: Set[asyncio.Task] = set()
+
+    @abstractmethod
+    async def load(self, sid: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def save(self, sid: str, data: dict) -> None: ...
+
+    @abstractmethod
+    async def delete(self, sid: str) -> None: ...
+
+    @abstractmethod
+    async def revoke_user(self, user_id: int) -> None: ...
+
+    def revoke_user_nowait(self, user_id: int) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.revoke_user(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class MemorySessionStore(SessionStore):
+    """In-process TTL + LRU; сессии живут до рестарта и не видны другим воркерам."""
+
+    def __init__(self, ttl_sec: int, max_size: int) -> None:
+        super().__init__()
+        self.ttl_sec = ttl_sec
+        self.max_size = max_size
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    async def load(self, sid: str) -> Optional[dict]:
+        entry = self._data.get(sid)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._data.pop(sid, None)
+            return None
+        self._data[sid] = (time.monotonic() + self.ttl_sec, entry[1])
+        self._data.move_to_end(sid)
+        return dict(entry[1])
+
+    async def save(self, sid: str, data: dict) -> None:
+        self._data[sid] = (time.monotonic() + self.ttl_sec, dict(data))
+        self._data.move_to_end(sid)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    async def delete(self, sid: str) -> None:
+        self._data.pop(sid, None)
+
+    async def revoke_user(self, user_id: int) -> None:
+        stale = [s for s, (_, d) in self._data.items() if d.get("user_id") == user_id]
+        for sid in stale:
+            self._data.pop(sid, None)
+
+
+# Чтение продлевает и сессию, и индекс её пользователя: иначе активная
+# дольше TTL сессия переживёт session:user:<id> и revoke_user её не найдёт.
+_LOAD_LUA = """
+local raw = redis.call('GETEX', KEYS[1], 'EX', ARGV[1])
+if raw then
+    local ok, data = pcall(cjson.decode, raw)
+    if ok and type(data) == 'table' and type(data.user_id) == 'number' then
+        redis.call('EXPIRE', ARGV[2] .. string.format('%d', data.user_id), ARGV[1])
+    end
+end
+return raw
+"""
+
+_DELETE_LUA = """
+local raw = redis.call('GETDEL', KEYS[1])
+if raw then
+    local ok, data = pcall(cjson.decode, raw)
+    if ok and type(data) == 'table' and type(data.user_id) == 'number' then
+        redis.call('SREM', ARGV[1] .. string.format('%d', data.user_id), ARGV[2])
+    end
+end
+return 0
+"""
+
+
+class RedisSessionStore(SessionStore):
+    """
+    session:<sid> — JSON с EX=ttl; чтение продлевает запись (GETEX).
+    session:user:<id> — множество sid пользователя для отзыва, с тем же
+    скользящим TTL. Пока Redis недоступен, работаем на памяти процесса.
+    """
+
+    def __init__(self, ttl_sec: int, fallback: MemorySessionStore) -> None:
+        super().__init__()
+        self.ttl_sec = ttl_sec
+        self.fallback = fallback
+        self._scripts: dict = {}
+        self._script_client = None
+
+    def _script(self, name: str, source: str):
+        # Скрипты привязаны к клиенту, а клиент пересоздаётся при переподключении.
+        if self._script_client is not redis_client.redis:
+            self._scripts = {}
+            self._script_client = redis_client.redis
+        if name not in self._scripts:
+            self._scripts[name] = redis_client.redis.register_script(source)
+        return self._scripts[name]
+
+    async def load(self, sid: str) -> Optional[dict]:
+        if not redis_client.connected:
+            return await self.fallback.load(sid)
+        try:
+            raw = await self._script("load", _LOAD_LUA)(
+                keys=[SESSION_KEY.format(sid)],
+                args=[self.ttl_sec, SESSION_USER_KEY.format("")],
+            )
+        except Exception as e:
+            log.warning("session read failed: %s", e)
+            return await self.fallback.load(sid)
+        return json.loads(raw) if raw else None
+
+    async def save(self, sid: str, data: dict) -> None:
+        if not redis_client.connected:
+            return await self.fallback.save(sid, data)
+        try:
+            async with redis_client.redis.pipeline(transaction=False) as pipe:
+                pipe.set(SESSION_KEY.format(sid), json.dumps(data), ex=self.ttl_sec)
+                if data.get("user_id"):
+                    user_key = SESSION_USER_KEY.format(data["user_id"])
+                    pipe.sadd(user_key, sid)
+                    pipe.expire(user_key, self.ttl_sec)
+                await pipe.execute()
+        except Exception as e:
+            log.warning("session write failed: %s", e)
+            await self.fallback.save(sid, data)
+
+    async def delete(self, sid: str) -> None:
+        await self.fallback.delete(sid)
+        if not redis_client.connected:
+            return
+        try:
+            await self._script("delete", _DELETE_LUA)(
+                keys=[SESSION_KEY.format(sid)],
+                args=[SESSION_USER_KEY.format(""), sid],
+            )
+        except Exception as e:
+            log.warning("session delete failed: %s", e)
+
+    async def revoke_user(self, user_id: int) -> None:
+        await self.fallback.revoke_user(user_id)
+        if not redis_client.connected:
+            return
+        user_key = SESSION_USER_KEY.format(user_id)
+        try:
+            sids = await redis_client.redis.smembers(user_key)
+            keys = [SESSION_KEY.format(sid) for sid in sids]
+            await redis_client.redis.delete(user_key, *keys)
+        except Exception as e:
+            log.warning("session revoke failed: %s", e)
+
+
+def build_session_store() -> SessionStore:
+    memory = MemorySessionStore(settings.SESSION_TTL_SEC, settings.SESSION_MEMORY_MAX)
+    if settings.SESSION_BACKEND.lower() == "redis":
+        return RedisSessionStore(settings.SESSION_TTL_SEC, memory)
+    return memory
+
+
+session_store = build_session_store()
+
+
+class ServerSessionMiddleware:
+    """Замена starlette SessionMiddleware: тот же request.session, данные на сервере."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: SessionStore,
+        max_age: int,
+        cookie_name: str = SESSION_COOKIE_NAME,
+        https_only: bool = False,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.max_age = max_age
+        self.cookie_name = cookie_name
+        self.flags = "; HttpOnly; SameSite=Lax" + ("; Secure" if https_only else "")
+
+    def _cookie(self, value: str, max_age: int) -> str:
+        return f"{self.cookie_name}={value}; Path=/; Max-Age={max_age}{self.flags}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        sid = HTTPConnection(scope).cookies.get(self.cookie_name)
+        original = await self.store.load(sid) if sid else None
+        if original is None:
+            sid, original = None, {}
+        scope["session"] = dict(original)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal sid
+            if message["type"] == "http.response.start":
+                data = scope["session"]
+                headers = MutableHeaders(scope=message)
+                if not data:
+                    if sid:
+                        await self.store.delete(sid)
+                        headers.append("Set-Cookie", self._cookie("", 0))
+                else:
+                    rotate = any(data.get(k) != original.get(k) for k in _AUTH_KEYS)
+                    if sid and rotate:
+                        # Защита от фиксации сессии: после входа — новый id.
+                        await self.store.delete(sid)
+                    if sid is None or rotate:
+                        sid = secrets.token_urlsafe(32)
+                    if rotate or data != original:
+                        await self.store.save(sid, data)
+                    headers.append("Set-Cookie", self._cookie(sid, self.max_age))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_sessions(mapper, connection, target: User) -> None:
+    # В сессии закэширован принципал (email, is_admin) — после правок
+    # пользователя в админке пусть войдёт заново.
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("sessions_revoke", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _revoke_after_commit(session: Session) -> None:
+    # После коммита: откаченная правка никого не разлогинивает, а вход,
+    # случившийся до коммита, не закэширует старый принципал.
+    for user_id in session.info.pop("sessions_revoke", ()):
+        session_store.revoke_user_nowait(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_revoke_on_rollback(session: Session) -> None:
+    session.info.pop("sessions_revoke", None)
@@ -0,0 +1,230 @@
+"""
+Быстрая авторизация по access-токену без БД.
+
+В токене, кроме sub, лежат email, adm (is_admin) и ver (users.token_version).
+Подпись проверяется один раз: проверенные claims кэшируются по sha256
+токена до его exp. Отзыв — через token_version: любое изменение email,
+пароля или прав увеличивает счётчик, и старые токены перестают проходить.
+Счётчик читается из памяти процесса (TOKEN_VERSION_CACHE_SEC), затем из
+Redis, и только при промахе обоих — из БД.
+
+Access-токен короткий; продлевается refresh-токеном (typ=refresh) через
+/auth/refresh. Все токены одной цепочки ротации несут общий fam — его отзыв
+(logout, повторное предъявление refresh) гасит всю цепочку, см. revocation.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Set
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.chat.redis_client import redis_client
+from app.core.config import settings
+from app.core.constants import TOKEN_VERSION_KEY, TOKEN_VERSION_REDIS_TTL_SEC
+from app.core.security import create_access_token, decode_access_token
+from app.db.models import User
+
+log = logging.getLogger("note_app.tokens")
+
+# Смена этих полей отзывает все выданные пользователю токены.
+_REVOKING_FIELDS = ("email", "hashed_password", "is_admin")
+
+
+class TokenVerifier:
+    """Ограниченный LRU проверенных токенов: sha256(token) -> (exp, claims)."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
+    def verify(self, token: str) -> dict:
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self._data.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._data.pop(key, None)
+
+        self.misses += 1
+        claims = decode_access_token(token)
+        exp = float(claims.get("exp") or 0)
+        if exp:
+            self._data[key] = (exp, claims)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return claims
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+class TokenVersionCache:
+    """users.token_version: память процесса -> Redis -> БД."""
+
+    def __init__(self, ttl_sec: float, max_size: int) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_size = max_size
+        self._data: OrderedDict[int, tuple[float, Optional[int]]] = OrderedDict()
+        # Loop держит на задачи только слабые ссылки — храним их до завершения.
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _remember(self, user_id: int, version: Optional[int]) -> None:
+        self._data[user_id] = (time.monotonic() + self.ttl_sec, version)
+        self._data.move_to_end(user_id)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    async def get(self, session: AsyncSession, user_id: int) -> Optional[int]:
+        """None — пользователя нет."""
+        entry = self._data.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        key = TOKEN_VERSION_KEY.format(user_id)
+        if redis_client.connected:
+            try:
+                raw = await redis_client.redis.get(key)
+                if raw is not None:
+                    version = int(raw) if raw != "" else None
+                    self._remember(user_id, version)
+                    return version
+            except Exception as e:
+                log.warning("token version read failed: %s", e)
+
+        # Только primary: реплика может вернуть счётчик до отзыва.
+        session.info["primary"] = True
+        version = await session.scalar(
+            select(User.token_version).where(User.id == user_id)
+        )
+        self._remember(user_id, version)
+        if redis_client.connected:
+            try:
+                # NX: пока мы читали БД, отзыв мог уже записать новую версию —
+                # прочитанная старая не должна её перетереть.
+                await redis_client.redis.set(
+                    key, _encode(version), ex=TOKEN_VERSION_REDIS_TTL_SEC, nx=True
+                )
+            except Exception as e:
+                log.warning("token version write failed: %s", e)
+        return version
+
+    async def invalidate(self, user_id: int, version: Optional[int]) -> None:
+        """Записывает новую версию (None — пользователь удалён), а не удаляет ключ."""
+        self._remember(user_id, version)
+        if not redis_client.connected:
+            return
+        try:
+            await redis_client.redis.set(
+                TOKEN_VERSION_KEY.format(user_id),
+                _encode(version),
+                ex=TOKEN_VERSION_REDIS_TTL_SEC,
+            )
+        except Exception as e:
+            log.warning("token version invalidate failed: %s", e)
+
+    def invalidate_nowait(self, user_id: int, version: Optional[int]) -> None:
+        self._remember(user_id, version)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.invalidate(user_id, version))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def _encode(version: Optional[int]) -> str:
+    # "" — отрицательный кэш для удалённых пользователей.
+    return "" if version is None else str(version)
+
+
+token_verifier = TokenVerifier(settings.JWT_CACHE_SIZE)
+token_versions = TokenVersionCache(
+    settings.TOKEN_VERSION_CACHE_SEC, settings.USER_CACHE_MAX_SIZE
+)
+
+
+def access_token_claims(user: User) -> dict:
+    return {
+        "email": user.email,
+        "adm": bool(user.is_admin),
+        "ver": user.token_version or 0,
+    }
+
+
+def refresh_token_ttl_sec() -> int:
+    return settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600
+
+
+def issue_token_pair(user: User, family: Optional[str] = None) -> dict:
+    """Новая пара токенов; family — продолжение существующей цепочки."""
+    family = family or uuid.uuid4().hex
+    access = create_access_token(
+        sub=user.id, claims={**access_token_claims(user), "fam": family}
+    )
+    refresh = create_access_token(
+        sub=user.id,
+        minutes=refresh_token_ttl_sec() // 60,
+        claims={
+            "typ": "refresh",
+            "jti": uuid.uuid4().hex,
+            "fam": family,
+            "ver": user.token_version or 0,
+        },
+    )
+    return {
+        "access_token": access,
+        "refresh_token": refresh,
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+def seconds_left(claims: dict) -> int:
+    return max(1, int(float(claims.get("exp") or 0) - time.time()))
+
+
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if any(state.attrs[f].history.has_changes() for f in _REVOKING_FIELDS):
+        target.token_version = (target.token_version or 0) + 1
+
+
+@event.listens_for(User, "after_update")
+def _mark_token_version_dirty(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        dirty = session.info.setdefault("token_versions_dirty", {})
+        dirty[target.id] = target.token_version
+
+
+@event.listens_for(User, "after_delete")
+def _mark_user_deleted(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("token_versions_dirty", {})[target.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # После коммита, иначе соседний запрос успеет закэшировать старый счётчик.
+    for user_id, version in session.info.pop("token_versions_dirty", {}).items():
+        token_versions.invalidate_nowait(user_id, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dirty_on_rollback(session: Session) -> None:
+    session.info.pop("token_versions_dirty", None)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.chat.redis_client import redis_client
+from app.core.config import settings
+from app.db.models import User
+
+log = logging.getLogger("note_app.user_cache")
+
+
+@dataclass(frozen=True, slots=True)
+class UserPrincipal:
+    """Всё, что нужно для авторизации запроса, без ORM-объекта и сессии."""
+
+    id: int
+    email: str
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(id=user.id, email=user.email, is_admin=bool(user.is_admin))
+
+
+class UserCache:
+    """Базовый интерфейс кэша принципалов + счётчики."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Loop держит на задачи только слабые ссылки — храним их до завершения.
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get(self, user_id: int) -> Optional[UserPrincipal]:
+        return None
+
+    async def set(self, principal: UserPrincipal) -> None:
+        return None
+
+    async def invalidate(self, user_id: int) -> None:
+        return None
+
+    def invalidate_nowait(self, user_id: int) -> None:
+        """Для синхронного кода (ORM-события): инвалидация в фоне."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.invalidate(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class NullUserCache(UserCache):
+    async def get(self, user_id: int) -> Optional[UserPrincipal]:
+        self.misses += 1
+        return None
+
+
+class MemoryUserCache(UserCache):
+    """In-process TTL + LRU с ограничением по размеру."""
+
+    def __init__(self, ttl_sec: int, max_size: int) -> None:
+        super().__init__()
+        self.ttl_sec = ttl_sec
+        self.max_size = max_size
+        self._data: OrderedDict[int, tuple[float, UserPrincipal]] = OrderedDict()
+
+    async def get(self, user_id: int) -> Optional[UserPrincipal]:
+        entry = self._data.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self._data.pop(user_id, None)
+            self.misses += 1
+            return None
+        self._data.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    async def set(self, principal: UserPrincipal) -> None:
+        self._data[principal.id] = (time.monotonic() + self.ttl_sec, principal)
+        self._data.move_to_end(principal.id)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def invalidate(self, user_id: int) -> None:
+        self._data.pop(user_id, None)
+
+    def invalidate_nowait(self, user_id: int) -> None:
+        self._data.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._data)}
+
+
+class RedisUserCache(UserCache):
+    """Общий для всех воркеров кэш в Redis; без Redis — всегда промах."""
+
+    KEY = "user:principal:{}"
+
+    def __init__(self, ttl_sec: int) -> None:
+        super().__init__()
+        self.ttl_sec = ttl_sec
+
+    async def get(self, user_id: int) -> Optional[UserPrincipal]:
+        if redis_client.connected:
+            try:
+                raw = await redis_client.redis.get(self.KEY.format(user_id))
+                if raw:
+                    self.hits += 1
+                    return UserPrincipal(**json.loads(raw))
+            except Exception as e:
+                log.warning("user cache read failed: %s", e)
+        self.misses += 1
+        return None
+
+    async def set(self, principal: UserPrincipal) -> None:
+        if not redis_client.connected:
+            return
+        try:
+            await redis_client.redis.set(
+                self.KEY.format(principal.id),
+                json.dumps(asdict(principal)),
+                ex=self.ttl_sec,
+            )
+        except Exception as e:
+            log.warning("user cache write failed: %s", e)
+
+    async def invalidate(self, user_id: int) -> None:
+        if not redis_client.connected:
+            return
+        try:
+            await redis_client.redis.delete(self.KEY.format(user_id))
+        except Exception as e:
+            log.warning("user cache invalidate failed: %s", e)
+
+
+def build_user_cache() -> UserCache:
+    backend = settings.USER_CACHE_BACKEND.lower()
+    if backend == "redis":
+        return RedisUserCache(settings.USER_CACHE_TTL_SEC)
+    if backend == "memory":
+        return MemoryUserCache(
+            settings.USER_CACHE_TTL_SEC, settings.USER_CACHE_MAX_SIZE
+        )
+    return NullUserCache()
+
+
+user_cache = build_user_cache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_dirty(mapper, connection, target: User) -> None:
+    # Любое изменение пользователя (в т.ч. is_admin из админки) сбрасывает кэш.
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("user_cache_dirty", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # После коммита, иначе соседний запрос успеет закэшировать старую строку.
+    for user_id in session.info.pop("user_cache_dirty", ()):
+        user_cache.invalidate_nowait(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dirty_on_rollback(session: Session) -> None:
+    session.info.pop("user_cache_dirty", None)
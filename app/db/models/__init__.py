@@ -2,7 +2,9 @@ from app.db.base import Base
 
 from .category import Category
 from .note import Note
+from .note_revision import NoteRevision
+from .note_tombstone import NoteTombstone
 from .user import User
 
-__all__ = ["Base", "User", "Category", "Note"]
+__all__ = ["Base", "User", "Category", "Note", "NoteRevision", "NoteTombstone"]
 metadata = Base.metadata
@@ -1,14 +1,27 @@
 from __future__ import annotations
 
-from sqlalchemy import ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.core.constants import NOTE_TITLE_MAX_LENGTH
+from app.core.constants import NOTE_TITLE_MAX_LENGTH, SEARCH_TS_CONFIG
 from app.db.base import Base
 
 
 class Note(Base):
     __tablename__ = "notes"
+    __table_args__ = (
+        Index("ix_notes_owner_updated_id", "owner_id", "updated_at", "id"),
+        Index("ix_notes_owner_seq", "owner_id", "seq"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(NOTE_TITLE_MAX_LENGTH), nullable=False)
@@ -21,5 +34,44 @@ class Note(Base):
         ForeignKey("categories.id"), index=True, nullable=False
     )
 
+    # Номер последнего изменения в ленте владельца (users.sync_seq), см. sync_utils.
+    seq: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0", nullable=False
+    )
+
     owner: Mapped["User"] = relationship(back_populates="notes")
     category: Mapped["Category"] = relationship(back_populates="notes")
+
+
+# Полнотекстовый поиск живёт вне ORM-модели: в PostgreSQL это сгенерированная
+# колонка tsvector + GIN, в SQLite (тесты) — внешняя FTS5-таблица с триггерами.
+_FTS_DDL = {
+    "postgresql": [
+        "ALTER TABLE notes ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_TS_CONFIG}'::regconfig, "
+        "coalesce(title, '') || ' ' || coalesce(content, ''))) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_notes_search_vector "
+        "ON notes USING gin (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5("
+        "title, content, content='notes', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS notes_fts_ai AFTER INSERT ON notes BEGIN "
+        "INSERT INTO notes_fts(rowid, title, content) "
+        "VALUES (new.id, new.title, new.content); END",
+        "CREATE TRIGGER IF NOT EXISTS notes_fts_ad AFTER DELETE ON notes BEGIN "
+        "INSERT INTO notes_fts(notes_fts, rowid, title, content) "
+        "VALUES ('delete', old.id, old.title, old.content); END",
+        "CREATE TRIGGER IF NOT EXISTS notes_fts_au AFTER UPDATE ON notes BEGIN "
+        "INSERT INTO notes_fts(notes_fts, rowid, title, content) "
+        "VALUES ('delete', old.id, old.title, old.content); "
+        "INSERT INTO notes_fts(rowid, title, content) "
+        "VALUES (new.id, new.title, new.content); END",
+    ],
+}
+
+for _dialect, _statements in _FTS_DDL.items():
+    for _stmt in _statements:
+        event.listen(
+            Note.__table__, "after_create", DDL(_stmt).execute_if(dialect=_dialect)
+        )
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import (
+    Boolean,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.core.constants import NOTE_TITLE_MAX_LENGTH
+from app.db.base import Base
+
+
+class NoteRevision(Base):
+    """
+    Версия заметки. payload — zlib: у снимка (is_snapshot) это весь текст,
+    у дельты — правки относительно предыдущей версии (см. revision_utils).
+    """
+
+    __tablename__ = "note_revisions"
+    __table_args__ = (
+        UniqueConstraint("note_id", "version", name="uq_note_revisions_note_version"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    note_id: Mapped[int] = mapped_column(
+        ForeignKey("notes.id", ondelete="CASCADE"), nullable=False
+    )
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    is_snapshot: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    # Версия снимка, от которого идёт цепочка дельт до этой версии.
+    base_version: Mapped[int] = mapped_column(Integer, nullable=False)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    content_sha1: Mapped[str] = mapped_column(String(40), nullable=False)
+    content_length: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    title: Mapped[str] = mapped_column(String(NOTE_TITLE_MAX_LENGTH), nullable=False)
+    category_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    note: Mapped["Note"] = relationship()
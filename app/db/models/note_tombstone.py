@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, ForeignKey, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class NoteTombstone(Base):
+    """
+    След удалённой заметки для дельта-синхронизации: клиент, который
+    синхронизировался до seq, узнаёт об удалении. created_at — время удаления.
+    """
+
+    __tablename__ = "note_tombstones"
+    __table_args__ = (Index("ix_note_tombstones_owner_seq", "owner_id", "seq"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    note_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    owner_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Boolean, Integer, String
+from sqlalchemy import BigInteger, Boolean, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.constants import USER_EMAIL_MAX_LENGTH, USER_PASSWORD_MAX_LENGTH
@@ -18,6 +18,14 @@ class User(Base):
         String(USER_PASSWORD_MAX_LENGTH), nullable=False
     )
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Растёт при смене email/пароля/прав — старые access-токены отзываются.
+    token_version: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    # Последний выданный seq изменений заметок пользователя.
+    sync_seq: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0", nullable=False
+    )
 
     # строковые аннотации или __future__ спасают от цикличности
     notes: Mapped[list["Note"]] = relationship(
@@ -0,0 +1,204 @@
+"""
+Чтение с реплик. GET-ручки, которым не важна свежесть до миллисекунды,
+берут сессию из get_read_session: запросы идут на здоровую реплику,
+а любая запись (flush/INSERT/UPDATE/DELETE) и всё после неё в той же
+сессии — на primary. Реплика с лагом больше REPLICA_MAX_LAG_SEC или
+недоступная выпадает из ротации; если здоровых нет — читаем с primary.
+
+Read-your-writes между запросами: после успешного небезопасного запроса
+ReadYourWritesMiddleware ставит cookie, и пока она жива, клиент читает
+с primary.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import AsyncGenerator, List, Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.session import _engine_kwargs, engine
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_COOKIE = "db_primary"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_PG_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+_PING_SQL = text("SELECT 1")
+
+
+@dataclass
+class Replica:
+    engine: AsyncEngine
+    healthy: bool = False
+    lag_sec: Optional[float] = None
+    error: Optional[str] = None
+    checked_at: float = 0.0
+
+
+class ReplicaSet:
+    def __init__(self, urls: List[str], max_lag: float, interval: float) -> None:
+        self.max_lag = max_lag
+        self.interval = interval
+        self.replicas = [
+            Replica(engine=create_async_engine(url, **_engine_kwargs(url)))
+            for url in urls
+        ]
+        self._rr = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[AsyncEngine]:
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._rr) % len(healthy)].engine
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                sql = _PG_LAG_SQL if conn.dialect.name == "postgresql" else _PING_SQL
+                res = await asyncio.wait_for(conn.execute(sql), self.interval)
+                lag = float(res.scalar() or 0.0) if sql is _PG_LAG_SQL else 0.0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if replica.healthy:
+                logger.warning(f"Replica {replica.engine.url!r} is down: {e}")
+            replica.healthy, replica.lag_sec, replica.error = False, None, str(e)
+            await replica.engine.dispose()
+        else:
+            healthy = lag <= self.max_lag
+            if healthy != replica.healthy:
+                logger.warning(
+                    f"Replica {replica.engine.url!r} "
+                    f"{'back in' if healthy else 'out of'} rotation, lag={lag:.1f}s"
+                )
+            replica.healthy, replica.lag_sec, replica.error = healthy, lag, None
+        replica.checked_at = time.time()
+
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check(r) for r in self.replicas))
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        await self.check()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "healthy": replica.healthy,
+                "lag_sec": replica.lag_sec,
+                "error": replica.error,
+            }
+            for replica in self.replicas
+        ]
+
+
+replica_set = ReplicaSet(
+    [u.strip() for u in settings.DATABASE_REPLICA_URLS.split(",") if u.strip()],
+    settings.REPLICA_MAX_LAG_SEC,
+    settings.REPLICA_CHECK_SEC,
+)
+
+
+class RoutingSession(Session):
+    """Читает с реплики, пока в сессии не было записи; дальше — только primary."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["primary"] = True
+        if not self.info.get("primary"):
+            replica = replica_set.pick()
+            if replica is not None:
+                self.info["replica"] = True
+                return replica.sync_engine
+        return engine.sync_engine
+
+
+ReadSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
+
+def retry_on_primary(session: AsyncSession) -> bool:
+    """
+    Для not-found при чтении с реплики: объект мог ещё не доехать.
+    Переключает сессию на primary и возвращает True, если стоит повторить.
+    """
+    if session.info.get("replica") and not session.info.get("primary"):
+        session.info["primary"] = True
+        return True
+    return False
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with ReadSessionLocal() as session:
+        if request.cookies.get(PRIMARY_COOKIE):
+            session.info["primary"] = True
+        yield session
+
+
+class ReadYourWritesMiddleware:
+    """После успешной записи клиент REPLICA_STICKY_SEC секунд читает с primary."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.cookie = (
+            f"{PRIMARY_COOKIE}=1; Max-Age={settings.REPLICA_STICKY_SEC}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        ).encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", self.cookie))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,14 +1,63 @@
 import asyncio
 import logging
+import time
+import uuid
 from sqlite3 import OperationalError
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
+from sqlalchemy import Engine, event, make_url, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
+from app.core.metrics import DB_POOL_CHECKOUT_WAIT, observe_query
+from app.core.profiling import record_query
 from app.db.models import Base
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False, pool_pre_ping=True)
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который меряет ожидание свободного соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+def _engine_kwargs(url: str) -> dict:
+    kwargs = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.startswith("sqlite"):
+        return kwargs
+    kwargs.update(
+        poolclass=TimedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+        pool_recycle=settings.DB_POOL_RECYCLE_SEC,
+    )
+    if make_url(url).get_driver_name() == "asyncpg":
+        connect_args = {
+            "timeout": settings.DB_CONNECT_TIMEOUT_SEC,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+        if settings.DB_PGBOUNCER:
+            # За PgBouncer в transaction mode соединение с сервером меняется
+            # между транзакциями: кэш стейтментов выключаем, имена делаем
+            # уникальными, чтобы не ловить "prepared statement already exists".
+            connect_args.update(
+                statement_cache_size=0,
+                prepared_statement_cache_size=0,
+                prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__",
+            )
+        kwargs["connect_args"] = connect_args
+    return kwargs
+
+
+engine = create_async_engine(
+    settings.DATABASE_URL, echo=False, **_engine_kwargs(settings.DATABASE_URL)
+)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
@@ -20,6 +69,69 @@ AsyncSessionLocal = async_sessionmaker(
 logger = logging.getLogger(__name__)
 
 
+# На классе Engine, чтобы замерялись и реплики.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    observe_query(elapsed)
+    record_query(statement, elapsed)
+
+
+def pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    stats = {"status": pool.status()}
+    if hasattr(pool, "checkedout"):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+        )
+    return stats
+
+
+_liveness_task: Optional[asyncio.Task] = None
+
+
+async def _pool_liveness(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with engine.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Без pre-ping мёртвые соединения иначе достанутся запросам.
+            logger.warning(f"DB liveness check failed, resetting pool: {e}")
+            await engine.dispose()
+
+
+def start_pool_liveness() -> None:
+    """Фоновая проверка соединений вместо pool_pre_ping."""
+    global _liveness_task
+    if settings.DB_POOL_PRE_PING or settings.DB_LIVENESS_SEC <= 0:
+        return
+    if _liveness_task is None:
+        _liveness_task = asyncio.create_task(_pool_liveness(settings.DB_LIVENESS_SEC))
+
+
+async def stop_pool_liveness() -> None:
+    global _liveness_task
+    if _liveness_task is not None:
+        _liveness_task.cancel()
+        try:
+            await _liveness_task
+        except asyncio.CancelledError:
+            pass
+        _liveness_task = None
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
@@ -0,0 +1,40 @@
+"""
+Компакция истории заметок; запускать по расписанию (cron / CronJob):
+
+    python -m app.jobs.compact_revisions [--keep-last 50] [--retention-days 90]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.api.utils.revision_utils import compact_revisions
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, engine
+
+log = logging.getLogger("note_app.revisions")
+
+
+async def run(keep_last: int, retention_days: int) -> int:
+    try:
+        async with AsyncSessionLocal() as session:
+            return await compact_revisions(session, keep_last, retention_days)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--keep-last", type=int, default=settings.NOTE_REVISION_KEEP_LAST
+    )
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.NOTE_REVISION_RETENTION_DAYS
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    removed = asyncio.run(run(args.keep_last, args.retention_days))
+    log.info("note revisions compacted: removed=%s", removed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Чистка следов удалённых заметок; запускать по расписанию (cron / CronJob):
+
+    python -m app.jobs.purge_tombstones [--retention-days 30]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.api.utils.sync_utils import purge_tombstones
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, engine
+
+log = logging.getLogger("note_app.sync")
+
+
+async def run(retention_days: int) -> int:
+    try:
+        async with AsyncSessionLocal() as session:
+            return await purge_tombstones(session, retention_days)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.NOTE_TOMBSTONE_RETENTION_DAYS
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    removed = asyncio.run(run(args.retention_days))
+    log.info("note tombstones purged: removed=%s", removed)
+
+
+if __name__ == "__main__":
+    main()
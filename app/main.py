@@ -3,17 +3,29 @@ from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.templating import Jinja2Templates
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from starlette.middleware.sessions import SessionMiddleware
 from starlette.staticfiles import StaticFiles
 
 from app.admin import setup_admin
+from app.chat.broadcast import MemoryBroadcast, RedisBroadcast
+from app.chat.manager import manager
 from app.chat.redis_client import redis_client
 from app.core.config import settings
-from app.core.limiting import limiter
-from app.db.session import engine, init_db, logger
+from app.core.constants import NOTE_EVENTS_CHANNEL
+from app.core.metrics import MetricsMiddleware
+from app.core.note_events import note_events
+from app.core.profiling import QueryProfilingMiddleware
+from app.core.readiness import readiness
+from app.core.revocation import denylist
+from app.core.security import password_pool
+from app.core.sessions import ServerSessionMiddleware, session_store
+from app.db.replicas import ReadYourWritesMiddleware, replica_set
+from app.db.session import (
+    engine,
+    init_db,
+    logger,
+    start_pool_liveness,
+    stop_pool_liveness,
+)
 from app.routers import root_router
 
 
@@ -21,26 +33,49 @@ from app.routers import root_router
 async def lifespan(app: FastAPI):
     if settings.APP_DEBUG:
         await init_db()
-
+    start_pool_liveness()
+    await replica_set.start()
 
     try:
         await redis_client.connect()
         logger.info("✅ Redis connected successfully")
         app.state.redis_available = True
+        redis_client.start_heartbeat(settings.REDIS_HEARTBEAT_SEC)
     except Exception as e:
         logger.error(f"❌ Redis connection failed: {e}")
         logger.warning("Continuing without Redis - using in-memory storage")
         app.state.redis_available = False
 
+    await manager.start(
+        RedisBroadcast() if app.state.redis_available else MemoryBroadcast()
+    )
+    await note_events.start(
+        RedisBroadcast(NOTE_EVENTS_CHANNEL)
+        if app.state.redis_available
+        else MemoryBroadcast()
+    )
+    if app.state.redis_available:
+        await denylist.start()
+    await readiness.start(app)
+
     try:
         yield
     finally:
+        await readiness.stop()
+        await denylist.stop()
+        await note_events.stop()
+        await manager.stop()
+        await stop_pool_liveness()
+        await replica_set.stop()
+
         try:
             await engine.dispose()
             logger.info("Database engine disposed")
         except Exception as e:
             logger.error(f"Error disposing database engine: {e}")
 
+        password_pool.shutdown()
+
 
         if getattr(app.state, "redis_available", False):
             try:
@@ -60,13 +95,20 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 templates = Jinja2Templates(directory="app/templates")
 
 
-app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
+app.add_middleware(
+    ServerSessionMiddleware,
+    store=session_store,
+    max_age=settings.SESSION_TTL_SEC,
+    https_only=settings.SESSION_HTTPS_ONLY,
+)
 setup_admin(app)
 
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+if replica_set.enabled:
+    app.add_middleware(ReadYourWritesMiddleware)
+if settings.SQL_PROFILING:
+    app.add_middleware(QueryProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(root_router)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, ConfigDict, EmailStr  # алфавит внутри строки
 
 
@@ -17,3 +19,9 @@ class LoginIn(Credentials):
 class TokenOut(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class RefreshIn(BaseModel):
+    refresh_token: str
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel
 
@@ -9,9 +9,13 @@ class ChatMessage(BaseModel):
     timestamp: datetime
     nickname: Optional[str] = None
     text: str
+    id: Optional[str] = None
+    room: Optional[str] = None
 
     def to_dict(self):
         return {
+            "id": self.id,
+            "room": self.room,
             "type": self.type,
             "timestamp": self.timestamp.isoformat(),
             "nickname": self.nickname,
@@ -25,4 +29,11 @@ class ChatMessage(BaseModel):
             timestamp=datetime.fromisoformat(data["timestamp"]),
             nickname=data.get("nickname"),
             text=data["text"],
+            id=data.get("id"),
+            room=data.get("room"),
         )
+
+
+class ChatHistoryPage(BaseModel):
+    items: List[ChatMessage]
+    next_before: Optional[str] = None
@@ -1,6 +1,9 @@
+from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from app.core.constants import NOTES_BATCH_MAX_IDS
 
 
 class NoteBase(BaseModel):
@@ -23,3 +26,93 @@ class NoteOut(NoteBase):
     id: int
     owner_id: int
     model_config = ConfigDict(from_attributes=True)
+
+
+class NotePage(BaseModel):
+    items: list[NoteOut]
+    next_cursor: Optional[str] = None
+
+
+class NoteSearchHit(NoteOut):
+    rank: float
+    snippet: str
+
+
+class NoteSearchPage(BaseModel):
+    items: list[NoteSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class BulkLineError(BaseModel):
+    line: int
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    errors: list[BulkLineError]
+
+
+class NoteBatchIds(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=NOTES_BATCH_MAX_IDS)
+
+
+class NoteBatchGetOut(BaseModel):
+    found: dict[int, NoteOut]
+    missing: list[int]
+
+
+class NoteBatchUpdateItem(NoteUpdate):
+    id: int
+    etag: Optional[str] = None  # как If-Match у PUT /{note_id}
+
+
+class NoteBatchUpdateIn(BaseModel):
+    items: list[NoteBatchUpdateItem] = Field(
+        min_length=1, max_length=NOTES_BATCH_MAX_IDS
+    )
+
+    @model_validator(mode="after")
+    def _unique_ids(self) -> "NoteBatchUpdateIn":
+        # Две правки одной заметки молча схлопнулись бы в одну.
+        seen, duplicates = set(), set()
+        for item in self.items:
+            (duplicates if item.id in seen else seen).add(item.id)
+        if duplicates:
+            raise ValueError(f"Duplicate note ids: {sorted(duplicates)}")
+        return self
+
+
+class NoteBatchUpdateOut(BaseModel):
+    updated: dict[int, NoteOut]
+    missing: list[int]
+    errors: dict[int, str]
+
+
+class NoteBatchDeleteOut(BaseModel):
+    deleted: list[int]
+    missing: list[int]
+
+
+class NoteRevisionOut(BaseModel):
+    version: int
+    title: str
+    category_id: Optional[int]
+    content_length: int
+    is_snapshot: bool
+    created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+
+class NoteRevisionPage(BaseModel):
+    items: list[NoteRevisionOut]
+    next_before: Optional[int] = None
+
+
+class NoteVersionOut(BaseModel):
+    version: int
+    title: str
+    content: str
+    category_id: Optional[int]
+    created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
@@ -8,9 +8,12 @@ from starlette import status
 
 from app.api.auth import get_user_by_email
 from app.api.user import normalize_email
-from app.core.security import hash_password, verify_password
+from app.core.antibrute import anti_brute
+from app.core.security import hash_password_async, verify_password_async
+from app.core.user_cache import UserPrincipal
 from app.db.models import User
 from app.db.session import get_session
+from app.web.utils import get_current_user, login_session
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -20,13 +23,14 @@ templates = Jinja2Templates(directory="templates")
 
 async def current_user(
     request: Request, session: AsyncSession = Depends(get_session)
-) -> User | None:
-    uid = request.session.get("user_id")
-    return await session.get(User, uid) if uid else None
+) -> UserPrincipal | None:
+    return await get_current_user(request, session)
 
 
 @router.get("/login-html", response_class=HTMLResponse)
-async def login_page(request: Request, user: User | None = Depends(current_user)):
+async def login_page(
+    request: Request, user: UserPrincipal | None = Depends(current_user)
+):
     logger.info("Login page accessed")
     return templates.TemplateResponse("login.html", {"request": request, "user": user})
 
@@ -38,22 +42,40 @@ async def login_submit(
     password: str = Form(...),
     session: AsyncSession = Depends(get_session),
 ):
-    user = await get_user_by_email(session, normalize_email(email))
-    if not user or not verify_password(password, user.hashed_password):
+    email = normalize_email(email)
+    brute_key = anti_brute.key(request.client.host if request.client else None, email)
+    if await anti_brute.is_blocked(brute_key):
+        logger.warning("Login blocked by antibrute for email: %s", email)
+        return templates.TemplateResponse(
+            "login.html",
+            {
+                "request": request,
+                "user": None,
+                "error": "Слишком много неудачных попыток, попробуйте позже",
+            },
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    user = await get_user_by_email(session, email)
+    if not user or not await verify_password_async(password, user.hashed_password):
         logger.warning("Login failed for email: %s", email)
+        await anti_brute.fail(brute_key)
         return templates.TemplateResponse(
             "login.html",
             {"request": request, "user": None, "error": "Неверный email или пароль"},
             status_code=status.HTTP_400_BAD_REQUEST,
         )
 
-    request.session["user_id"] = user.id
+    await anti_brute.ok(brute_key)
+    login_session(request, user)
     logger.info("Login successful for user: %s", user.id)
     return RedirectResponse("/", status_code=status.HTTP_302_FOUND)
 
 
 @router.get("/register-html", response_class=HTMLResponse)
-async def register_page(request: Request, user: User | None = Depends(current_user)):
+async def register_page(
+    request: Request, user: UserPrincipal | None = Depends(current_user)
+):
     logger.info("Register page accessed")
     return templates.TemplateResponse(
         "register.html", {"request": request, "user": user}
@@ -76,18 +98,20 @@ async def register_submit(
             status_code=status.HTTP_400_BAD_REQUEST,
         )
 
-    user = User(email=email, hashed_password=hash_password(password), is_admin=False)
+    user = User(
+        email=email, hashed_password=await hash_password_async(password), is_admin=False
+    )
     session.add(user)
     await session.commit()
     await session.refresh(user)
 
-    request.session["user_id"] = user.id
+    login_session(request, user)
     logger.info("Registration successful for user: %s", user.id)
     return RedirectResponse("/", status_code=status.HTTP_302_FOUND)
 
 
 @router.get("/logout")
 async def logout(request: Request):
-    request.session.pop("user_id", None)
+    request.session.clear()
     logger.info("User logged out")
     return RedirectResponse("/login-html", status_code=status.HTTP_302_FOUND)
@@ -1,8 +1,19 @@
-from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+import re
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
 
+from app.chat.history import MESSAGE_ID_RE
 from app.chat.manager import manager
+from app.core.constants import (
+    CHAT_DEFAULT_ROOM,
+    CHAT_HISTORY_PAGE_MAX,
+    CHAT_HISTORY_REPLAY,
+    CHAT_ROOM_PATTERN,
+)
 from app.core.templates import templates
+from app.schemas.chat import ChatHistoryPage
 
 router = APIRouter()
 
@@ -12,6 +23,16 @@ async def chat_page(request: Request):
     return templates.TemplateResponse("chat.html", {"request": request})
 
 
+@router.get("/chat/history", response_model=ChatHistoryPage)
+async def chat_history(
+    room: str = Query(CHAT_DEFAULT_ROOM, pattern=CHAT_ROOM_PATTERN),
+    before: Optional[str] = Query(None, pattern=MESSAGE_ID_RE.pattern),
+    limit: int = Query(CHAT_HISTORY_REPLAY, ge=1, le=CHAT_HISTORY_PAGE_MAX),
+):
+    items, next_before = await manager.history.page(room, before, limit)
+    return {"items": items, "next_before": next_before}
+
+
 @router.websocket("/ws/anon-chat")
 async def websocket_chat_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -23,7 +44,15 @@ async def websocket_chat_endpoint(websocket: WebSocket):
             await websocket.close(code=1008, reason="Nickname required")
             return
 
-        await manager.connect(websocket, nickname)
+        room = (data.get("room") or CHAT_DEFAULT_ROOM).strip()
+        if not re.match(CHAT_ROOM_PATTERN, room):
+            await websocket.close(code=1008, reason="Invalid room")
+            return
+        last_id = data.get("last_id")
+        if not isinstance(last_id, str) or not MESSAGE_ID_RE.match(last_id):
+            last_id = None
+
+        await manager.connect(websocket, nickname, room=room, last_id=last_id)
 
         while True:
             data = await websocket.receive_json()
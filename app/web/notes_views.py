@@ -1,10 +1,24 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, Form, Request, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.utils.db_utils import commit_or_409
+from app.api.utils.http_cache import (
+    is_not_modified,
+    not_modified_response,
+    note_etag,
+    set_validators,
+)
+from app.api.utils.pagination import paginate_notes, split_page
+from app.core.config import settings
+from app.core.constants import NOTES_PAGE_SIZE_DEFAULT
 from app.core.templates import templates
-from app.db.models import Category, Note, User
+from app.core.user_cache import UserPrincipal
+from app.db.models import Category, Note
+from app.db.replicas import get_read_session, retry_on_primary
 from app.db.session import get_session
 from app.web.utils import (
     get_all_categories,
@@ -20,38 +34,55 @@ router = APIRouter(prefix="/ui")
 
 async def current_user_dependency(
     request: Request, session: AsyncSession = Depends(get_session)
-) -> User | None:
+) -> UserPrincipal | None:
     return await get_current_user(request, session)
 
 
+async def current_user_read_dependency(
+    request: Request, session: AsyncSession = Depends(get_read_session)
+) -> UserPrincipal | None:
+    user = await get_current_user(request, session)
+    if user is None and "user_id" in request.session and retry_on_primary(session):
+        user = await get_current_user(request, session)
+    return user
+
+
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request, user: User | None = Depends(current_user_dependency)):
+async def index(
+    request: Request, user: UserPrincipal | None = Depends(current_user_dependency)
+):
     return templates.TemplateResponse("index.html", {"request": request, "user": user})
 
 
 @router.get("/notes", response_class=HTMLResponse)
 async def notes_list(
     request: Request,
-    user: User | None = Depends(current_user_dependency),
-    session: AsyncSession = Depends(get_session),
+    cursor: Optional[str] = None,
+    user: UserPrincipal | None = Depends(current_user_read_dependency),
+    session: AsyncSession = Depends(get_read_session),
 ):
     user = await require_authenticated_user(user)
 
-    notes_stmt = select(Note).where(Note.owner_id == user.id)
+    notes_stmt = paginate_notes(
+        select(Note).where(Note.owner_id == user.id), cursor, NOTES_PAGE_SIZE_DEFAULT
+    )
     result = await session.execute(notes_stmt)
-    notes = result.scalars().all()
+    notes, next_cursor = split_page(
+        list(result.scalars().all()), NOTES_PAGE_SIZE_DEFAULT
+    )
 
-    logger.debug(f"User {user.id} has {len(notes)} notes")
+    logger.debug(f"User {user.id}: page of {len(notes)} notes")
 
     return templates.TemplateResponse(
-        "notes_list.html", {"request": request, "notes": notes, "user": user}
+        "notes_list.html",
+        {"request": request, "notes": notes, "user": user, "next_cursor": next_cursor},
     )
 
 
 @router.get("/notes/new", response_class=HTMLResponse)
 async def notes_new_page(
     request: Request,
-    user: User | None = Depends(current_user_dependency),
+    user: UserPrincipal | None = Depends(current_user_dependency),
     session: AsyncSession = Depends(get_session),
 ):
     user = await require_authenticated_user(user)
@@ -69,7 +100,7 @@ async def notes_new_submit(
     content: str = Form(...),
     category_id: int = Form(...),
     session: AsyncSession = Depends(get_session),
-    user: User = Depends(current_user_dependency),
+    user: UserPrincipal = Depends(current_user_dependency),
 ):
     user = await require_authenticated_user(user)
 
@@ -88,26 +119,34 @@ async def notes_new_submit(
 async def notes_detail(
     note_id: int,
     request: Request,
-    user: User | None = Depends(current_user_dependency),
-    session: AsyncSession = Depends(get_session),
+    user: UserPrincipal | None = Depends(current_user_read_dependency),
+    session: AsyncSession = Depends(get_read_session),
 ):
     user = await require_authenticated_user(user)
     note = await get_user_note(note_id, user, session)
+    if note is None and retry_on_primary(session):
+        note = await get_user_note(note_id, user, session)
 
     redirect = require_note_access(note)
     if redirect:
         return redirect
 
-    return templates.TemplateResponse(
+    # Страница зависит ещё от шаблона и пользователя — учитываем их в теге.
+    etag = note_etag(note, f"u{user.id}-{settings.APP_VERSION}")
+    if is_not_modified(request, etag, note.updated_at):
+        return not_modified_response(etag, note.updated_at)
+    response = templates.TemplateResponse(
         "note_detail.html", {"request": request, "user": user, "note": note}
     )
+    set_validators(response, etag, note.updated_at)
+    return response
 
 
 @router.get("/notes/{note_id}/edit", response_class=HTMLResponse)
 async def notes_edit_page(
     note_id: int,
     request: Request,
-    user: User | None = Depends(current_user_dependency),
+    user: UserPrincipal | None = Depends(current_user_dependency),
     session: AsyncSession = Depends(get_session),
 ):
     user = await require_authenticated_user(user)
@@ -133,7 +172,7 @@ async def notes_edit_submit(
     content: str = Form(...),
     category_id: int = Form(...),
     session: AsyncSession = Depends(get_session),
-    user: User = Depends(current_user_dependency),
+    user: UserPrincipal = Depends(current_user_dependency),
 ):
     user = await require_authenticated_user(user)
     note = await get_user_note(note_id, user, session)
@@ -146,7 +185,7 @@ async def notes_edit_submit(
     note.content = content
     note.category_id = category_id
 
-    await session.commit()
+    await commit_or_409(session)
     await session.refresh(note)
 
     logger.info(f"Note updated: {note.id} by user: {user.id}")
@@ -159,7 +198,7 @@ async def notes_delete(
     note_id: int,
     request: Request,
     session: AsyncSession = Depends(get_session),
-    user: User = Depends(current_user_dependency),
+    user: UserPrincipal = Depends(current_user_dependency),
 ):
     user = await require_authenticated_user(user)
     note = await get_user_note(note_id, user, session)
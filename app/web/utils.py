@@ -1,30 +1,45 @@
 import logging
+from dataclasses import asdict
 
 from fastapi import HTTPException, Request, status
 from fastapi.responses import RedirectResponse
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Category, Note, User
+from app.core.category_cache import CategorySnapshot, category_cache
+from app.core.user_cache import UserPrincipal
+from app.db.models import Note, User
 
 logger = logging.getLogger(__name__)
 
 
-async def get_current_user(request: Request, session: AsyncSession) -> User | None:
+def login_session(request: Request, user: User) -> UserPrincipal:
+    """Записать пользователя в сессию вместе с принципалом (без похода в БД потом)"""
+    principal = UserPrincipal.from_user(user)
+    request.session["user_id"] = principal.id
+    request.session["user"] = asdict(principal)
+    return principal
+
+
+async def get_current_user(
+    request: Request, session: AsyncSession
+) -> UserPrincipal | None:
     """Получить текущего пользователя из сессии"""
     uid = request.session.get("user_id")
-    if uid:
-        user = await session.get(User, uid)
-        if user:
-            logger.debug(f"User found: {user.id}, {user.email}")
-        else:
-            logger.warning(f"User not found for ID: {uid}")
-        return user
-    logger.debug("No user_id in session")
-    return None
+    if not uid:
+        logger.debug("No user_id in session")
+        return None
+    cached = request.session.get("user")
+    if cached and cached.get("id") == uid:
+        return UserPrincipal(**cached)
+    user = await session.get(User, uid)
+    if not user:
+        logger.warning(f"User not found for ID: {uid}")
+        return None
+    logger.debug(f"User found: {user.id}, {user.email}")
+    return login_session(request, user)
 
 
-async def require_authenticated_user(user: User | None) -> User:
+async def require_authenticated_user(user: UserPrincipal | None) -> UserPrincipal:
     """Проверить аутентификацию пользователя"""
     if not user:
         logger.warning("Unauthorized access attempt")
@@ -35,7 +50,9 @@ async def require_authenticated_user(user: User | None) -> User:
     return user
 
 
-async def get_user_note(note_id: int, user: User, session: AsyncSession) -> Note | None:
+async def get_user_note(
+    note_id: int, user: UserPrincipal, session: AsyncSession
+) -> Note | None:
     """Получить заметку пользователя или None если нет прав"""
     note = await session.get(Note, note_id)
     if note:
@@ -58,9 +75,8 @@ def require_note_access(note: Note | None) -> RedirectResponse | None:
     return None
 
 
-async def get_all_categories(session: AsyncSession) -> list[Category]:
-    """Получить все категории"""
-    result = await session.execute(select(Category))
-    categories = result.scalars().all()
+async def get_all_categories(session: AsyncSession) -> list[CategorySnapshot]:
+    """Получить все категории (из кэша)"""
+    categories = list(await category_cache.list(session))
     logger.debug(f"Loaded {len(categories)} categories")
     return categories
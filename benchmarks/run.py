@@ -0,0 +1,377 @@
+"""
+Нагрузочный прогон REST API, HTML-страниц и websocket-чата.
+
+По умолчанию поднимает офлайн-сервер (benchmarks.server: SQLite + fakeredis)
+в отдельном процессе; с --base-url бьёт в уже запущенный стенд.
+
+    python -m benchmarks.run --clients 20 --requests 50 --output bench.json
+    python -m benchmarks.run --baseline bench.json --max-regression 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import websockets
+
+from benchmarks.server import BENCH_CATEGORY
+
+# Роутеры notes/categories подключены с префиксом и внутри, и снаружи.
+AUTH = "/api/v1/auth"
+NOTES = "/api/v1/notes/notes"
+CATEGORIES = "/api/v1/categories/categories"
+PASSWORD = "bench-password"
+
+
+@dataclass
+class Scenario:
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    async def timed(self, call: Callable[[], Awaitable[httpx.Response]]):
+        started = time.perf_counter()
+        try:
+            resp = await call()
+        except Exception:
+            self.errors += 1
+            return None
+        self.latencies.append(time.perf_counter() - started)
+        if resp.status_code >= 400:
+            self.errors += 1
+        return resp
+
+    def summary(self) -> dict:
+        data = sorted(self.latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not data:
+                return None
+            return round(data[min(len(data) - 1, int(p * len(data)))] * 1000, 3)
+
+        return {
+            "count": len(data),
+            "errors": self.errors,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "rps": round(len(data) / self.elapsed, 2) if self.elapsed else None,
+        }
+
+
+@dataclass
+class BenchUser:
+    email: str
+    token: str = ""
+    note_id: int = 0
+
+
+class Bench:
+    def __init__(self, base_url: str, clients: int, requests: int, logins: int):
+        self.base_url = base_url.rstrip("/")
+        self.clients = clients
+        self.requests = requests
+        self.logins = logins
+        self.scenarios: Dict[str, Scenario] = {}
+        self.category_id: Optional[int] = None
+
+    def scenario(self, name: str) -> Scenario:
+        return self.scenarios.setdefault(name, Scenario(name))
+
+    async def run_concurrently(self, names: List[str], worker, users: List[BenchUser]):
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(u) for u in users))
+        elapsed = time.perf_counter() - started
+        for name in names:
+            self.scenario(name).elapsed = elapsed
+
+    async def setup(self, client: httpx.AsyncClient) -> List[BenchUser]:
+        resp = await client.get(f"{CATEGORIES}/")
+        resp.raise_for_status()
+        by_name = {c["name"]: c["id"] for c in resp.json()}
+        if not by_name:
+            raise SystemExit("No categories on the target server")
+        self.category_id = by_name.get(BENCH_CATEGORY) or next(iter(by_name.values()))
+
+        run_id = uuid.uuid4().hex[:8]
+        users = [
+            BenchUser(email=f"bench-{run_id}-{i}@example.com")
+            for i in range(self.clients)
+        ]
+
+        async def register(user: BenchUser):
+            await client.post(
+                f"{AUTH}/register", json={"email": user.email, "password": PASSWORD}
+            )
+            resp = await client.post(
+                f"{AUTH}/login", data={"username": user.email, "password": PASSWORD}
+            )
+            resp.raise_for_status()
+            user.token = resp.json()["access_token"]
+
+        await asyncio.gather(*(register(u) for u in users))
+        return users
+
+    async def auth_login(self, client: httpx.AsyncClient, users: List[BenchUser]):
+        sc = self.scenario("api_login")
+
+        async def worker(user: BenchUser):
+            for _ in range(self.logins):
+                await sc.timed(
+                    lambda: client.post(
+                        f"{AUTH}/login",
+                        data={"username": user.email, "password": PASSWORD},
+                    )
+                )
+
+        await self.run_concurrently([sc.name], worker, users)
+
+    async def notes_crud(self, client: httpx.AsyncClient, users: List[BenchUser]):
+        names = [
+            "notes_create",
+            "notes_get",
+            "notes_update",
+            "notes_list",
+            "notes_delete",
+        ]
+        create, get, update, listing, delete = (self.scenario(n) for n in names)
+
+        async def worker(user: BenchUser):
+            headers = {"Authorization": f"Bearer {user.token}"}
+            for i in range(self.requests):
+                resp = await create.timed(
+                    lambda: client.post(
+                        f"{NOTES}/",
+                        headers=headers,
+                        json={
+                            "title": f"bench {i}",
+                            "content": "lorem ipsum " * 50,
+                            "category_id": self.category_id,
+                        },
+                    )
+                )
+                if resp is None or resp.status_code >= 400:
+                    continue
+                note_id = resp.json()["id"]
+                url = f"{NOTES}/{note_id}"
+                await get.timed(lambda: client.get(url, headers=headers))
+                await update.timed(
+                    lambda: client.put(url, headers=headers, json={"title": "upd"})
+                )
+                await listing.timed(lambda: client.get(f"{NOTES}/", headers=headers))
+                await delete.timed(lambda: client.delete(url, headers=headers))
+
+            # Заметка для HTML-сценария.
+            resp = await client.post(
+                f"{NOTES}/",
+                headers=headers,
+                json={"title": "ui", "content": "ui", "category_id": self.category_id},
+            )
+            if resp.status_code < 400:
+                user.note_id = resp.json()["id"]
+
+        await self.run_concurrently(names, worker, users)
+
+    async def ui_pages(self, users: List[BenchUser]):
+        names = ["ui_notes_list", "ui_note_detail"]
+        listing, detail = (self.scenario(n) for n in names)
+
+        async def worker(user: BenchUser):
+            async with httpx.AsyncClient(base_url=self.base_url, timeout=60) as ui:
+                await ui.post(
+                    "/login-html", data={"email": user.email, "password": PASSWORD}
+                )
+                for _ in range(self.requests):
+                    await listing.timed(lambda: ui.get("/ui/notes"))
+                    if user.note_id:
+                        await detail.timed(lambda: ui.get(f"/ui/notes/{user.note_id}"))
+
+        await self.run_concurrently(names, worker, users)
+
+    async def ws_chat(self, users: List[BenchUser]):
+        sc = self.scenario("ws_chat_roundtrip")
+        ws_url = self.base_url.replace("http", "ws", 1) + "/ws/anon-chat"
+        room = f"bench-{uuid.uuid4().hex[:8]}"
+        ready = asyncio.Barrier(len(users))
+
+        async def worker(user: BenchUser):
+            nickname = user.email.split("@")[0]
+            async with websockets.connect(ws_url, max_queue=None) as ws:
+                await ws.send(json.dumps({"nickname": nickname, "room": room}))
+                await ready.wait()
+                for i in range(self.requests):
+                    marker = f"{nickname}:{i}"
+                    started = time.perf_counter()
+                    try:
+                        await ws.send(json.dumps({"text": marker}))
+                        while True:
+                            msg = json.loads(await asyncio.wait_for(ws.recv(), 30))
+                            if msg.get("text") == marker:
+                                break
+                    except Exception:
+                        sc.errors += 1
+                        break
+                    sc.latencies.append(time.perf_counter() - started)
+
+        await self.run_concurrently([sc.name], worker, users)
+
+    async def run(self) -> dict:
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=60) as client:
+            users = await self.setup(client)
+            await self.auth_login(client, users)
+            await self.notes_crud(client, users)
+        await self.ui_pages(users)
+        await self.ws_chat(users)
+        return {name: sc.summary() for name, sc in self.scenarios.items()}
+
+
+def rss_kb(pid: Optional[int]) -> Optional[int]:
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_offline_server(db_path: str) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    cmd = [sys.executable, "-m", "benchmarks.server"]
+    proc = subprocess.Popen(cmd + ["--port", str(port), "--db", db_path])
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("Benchmark server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/ping", timeout=1).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("Benchmark server did not start in time")
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Регрессия — рост p95 или падение rps больше чем на max_regression."""
+    problems = []
+    for name, base in baseline.get("scenarios", {}).items():
+        cur = current["scenarios"].get(name)
+        if not cur:
+            continue
+        if base.get("p95_ms") and cur.get("p95_ms"):
+            change = cur["p95_ms"] / base["p95_ms"] - 1
+            if change > max_regression:
+                problems.append(
+                    f"{name}: p95 {base['p95_ms']} -> {cur['p95_ms']} ms "
+                    f"(+{change:.0%})"
+                )
+        if base.get("rps") and cur.get("rps"):
+            change = 1 - cur["rps"] / base["rps"]
+            if change > max_regression:
+                problems.append(
+                    f"{name}: rps {base['rps']} -> {cur['rps']} (-{change:.0%})"
+                )
+    return problems
+
+
+def print_table(report: dict) -> None:
+    header = f"{'scenario':<22}{'count':>8}{'err':>6}{'p50':>10}{'p95':>10}"
+    print(header + f"{'p99':>10}{'rps':>10}")
+    for name, s in report["scenarios"].items():
+        print(
+            f"{name:<22}{s['count']:>8}{s['errors']:>6}"
+            f"{s['p50_ms'] or '-':>10}{s['p95_ms'] or '-':>10}"
+            f"{s['p99_ms'] or '-':>10}{s['rps'] or '-':>10}"
+        )
+    print("memory:", json.dumps(report["memory"]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", help="Target server; default: offline server")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=3, help="Logins per client")
+    parser.add_argument("--output", help="Write JSON report here")
+    parser.add_argument("--baseline", help="Compare with a stored JSON report")
+    parser.add_argument("--max-regression", type=float, default=0.15)
+    args = parser.parse_args()
+
+    proc = None
+    tmpdir = None
+    base_url = args.base_url
+    if base_url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        proc, base_url = start_offline_server(os.path.join(tmpdir.name, "bench.db"))
+
+    server_pid = proc.pid if proc else None
+    rss_start = rss_kb(server_pid)
+    try:
+        bench = Bench(base_url, args.clients, args.requests, args.logins)
+        scenarios = asyncio.run(bench.run())
+        rss_end = rss_kb(server_pid)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "base_url": args.base_url or "offline",
+            "clients": args.clients,
+            "requests": args.requests,
+            "logins": args.logins,
+        },
+        "scenarios": scenarios,
+        "memory": {
+            "server_rss_start_kb": rss_start,
+            "server_rss_end_kb": rss_end,
+            "client_max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+    }
+    print_table(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        if problems:
+            print("Regressions against baseline:")
+            for line in problems:
+                print("  " + line)
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Офлайн-сервер для бенчмарков: SQLite вместо Postgres, fakeredis вместо Redis,
+rate limit выключен (иначе логин-шторм упрётся в 5/minute).
+
+    python -m benchmarks.server --port 8765 --db /tmp/bench.sqlite3
+"""
+import argparse
+import asyncio
+import os
+
+BENCH_CATEGORY = "bench"
+
+
+def configure_env(db_path: str) -> None:
+    os.environ.update(
+        {
+            "APP_NAME": "Note App (bench)",
+            "APP_VERSION": "bench",
+            "APP_DEBUG": "true",
+            "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+            "REDIS_HOST": "localhost",
+            "REDIS_PORT": "6379",
+            "REDIS_PASSWORD": "",
+            "SECRET_KEY": "bench-secret-key",
+            "ALGORITHM": "HS256",
+            "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+            "ADMIN_SESSION_KEY": "admin_user_id",
+        }
+    )
+
+
+async def seed() -> None:
+    from sqlalchemy import select
+
+    from app.db.models import Category
+    from app.db.session import AsyncSessionLocal, engine, init_db
+
+    await init_db(retries=1)
+    async with AsyncSessionLocal() as session:
+        exists = await session.execute(
+            select(Category.id).where(Category.name == BENCH_CATEGORY)
+        )
+        if exists.scalar_one_or_none() is None:
+            session.add(Category(name=BENCH_CATEGORY))
+            await session.commit()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="bench.sqlite3")
+    args = parser.parse_args()
+
+    configure_env(os.path.abspath(args.db))
+
+    import uvicorn
+    from fakeredis import FakeAsyncRedis
+
+    from app.chat.redis_client import redis_client
+    from app.core.limiting import limiter
+
+    async def fake_connect():
+        redis_client.redis = FakeAsyncRedis(decode_responses=True)
+        await redis_client.redis.ping()
+        redis_client.connected = True
+
+    redis_client.connect = fake_connect
+    limiter.enabled = False
+
+    asyncio.run(seed())
+
+    from app.main import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 let websocket = null;
 let currentNickname = '';
+let lastMessageId = null;
+const currentRoom = new URLSearchParams(location.search).get('room') || 'general';
 
 function connectToChat() {
   const nickInput = document.getElementById('nickname-input');
@@ -14,7 +16,12 @@ function connectToChat() {
     websocket = new WebSocket(`${scheme}://${location.host}/ws/anon-chat`);
 
     websocket.onopen = () => {
-      websocket.send(JSON.stringify({ nickname: currentNickname }));
+      // last_id — докачать только пропущенное после переподключения
+      websocket.send(JSON.stringify({
+        nickname: currentNickname,
+        room: currentRoom,
+        last_id: lastMessageId,
+      }));
       document.getElementById('username-form').style.display = 'none';
       document.getElementById('message-form').style.display = 'block';
     };
@@ -22,6 +29,7 @@ function connectToChat() {
     websocket.onmessage = (event) => {
       try {
         const message = JSON.parse(event.data);
+        if (message.id) lastMessageId = message.id;
         displayMessage(message);
       } catch (e) {
         console.error('Bad message:', e);